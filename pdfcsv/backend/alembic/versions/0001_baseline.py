@@ -0,0 +1,116 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Matches the tables previously created by Base.metadata.create_all. Existing
+databases should be marked as migrated with `alembic stamp 0001`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('subscription_tier', sa.Enum('FREE', 'PRO', name='subscriptiontier'), nullable=True),
+        sa.Column('stripe_customer_id', sa.String(), nullable=True),
+        sa.Column('stripe_subscription_id', sa.String(), nullable=True),
+        sa.Column('quickbooks_realm_id', sa.String(), nullable=True),
+        sa.Column('quickbooks_access_token', sa.String(), nullable=True),
+        sa.Column('quickbooks_refresh_token', sa.String(), nullable=True),
+        sa.Column('quickbooks_token_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('pages_processed_this_month', sa.Integer(), nullable=True),
+        sa.Column('pages_processed_total', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stripe_customer_id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    
+    op.create_table(
+        'documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.Column('file_size', sa.Integer(), nullable=False),
+        sa.Column('mime_type', sa.String(), nullable=True),
+        sa.Column('page_count', sa.Integer(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum(
+                'UPLOADED', 'PROCESSING', 'OCR_COMPLETE', 'EXTRACTION_COMPLETE', 'READY', 'ERROR', 'SYNCED',
+                name='documentstatus'
+            ),
+            nullable=True
+        ),
+        sa.Column(
+            'document_type',
+            sa.Enum('BANK_STATEMENT', 'CREDIT_CARD', 'UNKNOWN', name='documenttype'),
+            nullable=True
+        ),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('ocr_text', sa.Text(), nullable=True),
+        sa.Column('ocr_confidence', sa.Integer(), nullable=True),
+        sa.Column('synced_to_quickbooks', sa.Boolean(), nullable=True),
+        sa.Column('quickbooks_sync_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_documents_id', 'documents', ['id'])
+    
+    op.create_table(
+        'transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('transaction_date', sa.Date(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column('balance', sa.Numeric(10, 2), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('category_confidence', sa.Integer(), nullable=True),
+        sa.Column('quickbooks_vendor_name', sa.String(), nullable=True),
+        sa.Column('quickbooks_account_id', sa.String(), nullable=True),
+        sa.Column('quickbooks_transaction_id', sa.String(), nullable=True),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('synced_to_quickbooks', sa.Boolean(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('synced_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_transactions_id', 'transactions', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_id', table_name='transactions')
+    op.drop_table('transactions')
+    op.drop_index('ix_documents_id', table_name='documents')
+    op.drop_table('documents')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
+    sa.Enum(name='documenttype').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='documentstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='subscriptiontier').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,42 @@
+"""transaction query indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Supports GET /transactions: per-document date-ordered scans, category
+filters, and case-insensitive description search via pg_trgm.
+"""
+from alembic import op
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_transactions_document_id_transaction_date_id',
+        'transactions',
+        ['document_id', 'transaction_date', 'id']
+    )
+    op.create_index('ix_transactions_document_id_category', 'transactions', ['document_id', 'category'])
+    
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_transactions_description_trgm',
+            'transactions',
+            ['description'],
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_transactions_description_trgm', table_name='transactions')
+    op.drop_index('ix_transactions_document_id_category', table_name='transactions')
+    op.drop_index('ix_transactions_document_id_transaction_date_id', table_name='transactions')
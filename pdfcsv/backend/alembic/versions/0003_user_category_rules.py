@@ -0,0 +1,22 @@
+"""user category rules
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('category_rules', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'category_rules')
@@ -0,0 +1,37 @@
+"""merchant categories
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Per-user normalized merchant -> category memory learned from edits.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'merchant_categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'merchant', name='uq_merchant_categories_user_id_merchant'),
+    )
+    op.create_index('ix_merchant_categories_id', 'merchant_categories', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_merchant_categories_id', table_name='merchant_categories')
+    op.drop_table('merchant_categories')
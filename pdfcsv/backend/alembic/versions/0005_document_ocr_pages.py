@@ -0,0 +1,24 @@
+"""document ocr pages
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Per-page OCR method (text layer, Tesseract or Textract) and confidence.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('ocr_pages', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'ocr_pages')
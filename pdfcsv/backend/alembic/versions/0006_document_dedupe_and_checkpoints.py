@@ -0,0 +1,32 @@
+"""document dedupe and checkpoints
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Content hash for duplicate upload detection, the stored extraction stage
+output the pipeline resumes from, and the indexes behind duplicate lookup
+and the keyset-paginated document list.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('extraction_data', sa.Text(), nullable=True))
+    op.create_index('ix_documents_user_id_content_hash', 'documents', ['user_id', 'content_hash'])
+    op.create_index('ix_documents_user_id_created_at_id', 'documents', ['user_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_user_id_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_user_id_content_hash', table_name='documents')
+    op.drop_column('documents', 'extraction_data')
+    op.drop_column('documents', 'content_hash')
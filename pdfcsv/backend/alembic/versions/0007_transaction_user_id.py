@@ -0,0 +1,39 @@
+"""transaction user id
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+Copies documents.user_id onto transactions, so GET /transactions can read a
+user's rows newest first straight from (user_id, transaction_date, id)
+instead of joining documents and sorting every row the user has.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE transactions SET user_id = '
+        '(SELECT documents.user_id FROM documents WHERE documents.id = transactions.document_id)'
+    )
+    op.alter_column('transactions', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.create_foreign_key('transactions_user_id_fkey', 'transactions', 'users', ['user_id'], ['id'])
+    op.create_index(
+        'ix_transactions_user_id_transaction_date_id',
+        'transactions',
+        ['user_id', 'transaction_date', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_id_transaction_date_id', table_name='transactions')
+    op.drop_constraint('transactions_user_id_fkey', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'user_id')
@@ -0,0 +1,32 @@
+"""transaction user category index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+GET /transactions always filters on user_id, so the category filter was
+served by (document_id, category) only when a document_id was also given.
+Replaces it with (user_id, category, transaction_date, id), which serves the
+user filter, the category filter and the newest-first keyset order together.
+"""
+from alembic import op
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_transactions_user_id_category_transaction_date_id',
+        'transactions',
+        ['user_id', 'category', 'transaction_date', 'id']
+    )
+    op.drop_index('ix_transactions_document_id_category', table_name='transactions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_transactions_document_id_category', 'transactions', ['document_id', 'category'])
+    op.drop_index('ix_transactions_user_id_category_transaction_date_id', table_name='transactions')
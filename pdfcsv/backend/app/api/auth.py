@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import List, Optional
+import json
 
 from ..core.database import get_db
-from ..core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from ..core.security import (
+    hash_password_async, verify_and_update_password, create_access_token, decode_access_token
+)
 from ..core.config import settings
 from ..models.user import User
-from ..schemas.user import UserCreate, UserLogin, UserResponse, Token
+from ..schemas.user import UserCreate, UserLogin, UserResponse, Token, CategoryRuleSchema
+from ..services.user_cache import user_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """Get current user from JWT token"""
+    """Get current user from JWT token (the user row is served from user_cache)"""
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,30 +36,22 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = user_cache.load(db, int(user_id))
     if user is None:
         raise credentials_exception
     
     return user
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
-    
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create new user
+def _get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, user_data: UserCreate, hashed_password: str) -> User:
     user = User(
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password)
+        hashed_password=hashed_password
     )
     
     db.add(user)
@@ -63,14 +61,45 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return user
 
 
+def _update_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+
+
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+    """
+    Register a new user
+    
+    Async so bcrypt runs on the password hashing pool and database calls on
+    the threadpool, without holding a request thread for the whole hash.
+    """
+    
+    # Check if user already exists
+    existing_user = await run_in_threadpool(_get_user_by_email, db, user_data.email)
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    
+    # Create new user
+    hashed_password = await hash_password_async(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data, hashed_password)
+
+
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """Login user and return access token"""
     
     # Find user
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await run_in_threadpool(_get_user_by_email, db, credentials.email)
+    
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(credentials.password, user.hashed_password)
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -83,6 +112,10 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="User account is inactive"
         )
     
+    # The stored hash predates the current BCRYPT_ROUNDS; upgrade it in place
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -97,3 +130,25 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
+
+
+@router.get("/me/category-rules", response_model=List[CategoryRuleSchema])
+def get_category_rules(current_user: User = Depends(get_current_user)):
+    """Get the current user's keyword category rules"""
+    return json.loads(current_user.category_rules) if current_user.category_rules else []
+
+
+@router.put("/me/category-rules", response_model=List[CategoryRuleSchema])
+def set_category_rules(
+    rules: List[CategoryRuleSchema],
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Replace the current user's keyword category rules
+    
+    They apply to documents processed from now on, alongside the default rules.
+    """
+    current_user.category_rules = json.dumps([rule.model_dump() for rule in rules]) if rules else None
+    db.commit()
+    return rules
@@ -1,30 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, selectinload, defer
+from datetime import datetime
+from typing import List, Optional
+import hashlib
 import os
 import uuid
 import logging
 
+from ..core.config import settings
 from ..core.database import get_db
 from ..models.user import User
 from ..models.document import Document, DocumentStatus
-from ..schemas.document import DocumentResponse, DocumentListResponse
+from ..models.transaction import Transaction
+from ..schemas.document import (
+    DocumentResponse, DocumentSummary, DocumentListItem, DocumentListResponse, TransactionResponse
+)
 from .auth import get_current_user
-from ..services.processing_service import processing_service
+from .pagination import encode_cursor, decode_cursor
+from ..services.storage_service import get_storage
+from ..services.export_service import export_service, ExportFormat
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
 
 @router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
-    background_tasks: BackgroundTasks,
+    response: Response,
     file: UploadFile = File(...),
+    force: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Upload a PDF document for processing"""
+    """
+    Upload a PDF document for processing
+    
+    Re-uploading a PDF the user already has returns the existing document
+    (with 200 instead of 201) rather than paying for OCR and GPT again.
+    Pass force=true to process it as a new document anyway; it is then
+    run through OCR and GPT afresh rather than from their caches.
+    
+    Database calls run in the threadpool, as the session is synchronous.
+    """
     
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
@@ -33,29 +55,45 @@ async def upload_document(
             detail="Only PDF files are supported"
         )
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-    
-    # Check file size (max 10MB for now)
-    if file_size > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size must be less than 10MB"
-        )
+    max_size_mb = settings.MAX_UPLOAD_SIZE_MB
+    too_large = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"File size must be less than {max_size_mb}MB"
+    )
+    max_bytes = max_size_mb * 1024 * 1024
     
-    # Generate unique filename
+    # Generate unique storage key
     file_ext = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
+    file_path = f"uploads/{uuid.uuid4()}{file_ext}"
+    
+    # Oversized request bodies were already refused while being received
+    # (UploadSizeLimitMiddleware); Starlette has spooled this one to a temp
+    # file. Copy it to storage in chunks, enforcing the exact file limit and
+    # hashing as we go, so the upload is never held in memory as a whole
+    hasher = hashlib.sha256()
+    file_size = 0
+    writer = await run_in_threadpool(get_storage().open_writer, file_path)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > max_bytes:
+                raise too_large
+            hasher.update(chunk)
+            await run_in_threadpool(writer.write, chunk)
+        await run_in_threadpool(writer.commit)
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
     
-    # TODO: Upload to S3/R2
-    # For now, we'll store locally in a temp directory
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, unique_filename)
+    content_hash = hasher.hexdigest()
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    if not force:
+        existing = await run_in_threadpool(_find_duplicate, db, current_user.id, content_hash)
+        if existing:
+            logger.info(f"Upload matches document {existing.id}; skipping reprocessing")
+            await run_in_threadpool(get_storage().delete, file_path)
+            response.status_code = status.HTTP_200_OK
+            return existing
     
     # Create document record
     document = Document(
@@ -63,63 +101,115 @@ async def upload_document(
         filename=file.filename,
         file_path=file_path,
         file_size=file_size,
+        content_hash=content_hash,
         status=DocumentStatus.UPLOADED
     )
+    await run_in_threadpool(_save_document, db, document)
+    
+    # Hand off to the worker queue; the worker reads the file from storage.
+    # A forced upload is processed from scratch, skipping the OCR and GPT caches
+    await run_in_threadpool(_enqueue_processing, document.id, use_cache=not force)
     
+    return document
+
+
+def _find_duplicate(db: Session, user_id: int, content_hash: str) -> Optional[Document]:
+    """Get the user's latest non-failed document with the same content, if any"""
+    return (
+        db.query(Document)
+        .filter(
+            Document.user_id == user_id,
+            Document.content_hash == content_hash,
+            Document.status != DocumentStatus.ERROR
+        )
+        .order_by(Document.created_at.desc())
+        .first()
+    )
+
+
+def _save_document(db: Session, document: Document) -> None:
+    """Insert a new document record"""
     db.add(document)
     db.commit()
     db.refresh(document)
-    
-    # Process document in background
-    logger.info(f"Queuing document {document.id} for processing")
-    background_tasks.add_task(
-        _process_document_task,
-        document_id=document.id,
-        pdf_bytes=content,
-        db=db
-    )
-    
-    return document
 
 
-async def _process_document_task(document_id: int, pdf_bytes: bytes, db: Session):
-    """Background task to process document"""
-    try:
-        result = await processing_service.process_document(document_id, pdf_bytes, db)
-        if result['success']:
-            logger.info(f"Document {document_id} processed successfully")
-        else:
-            logger.error(f"Document {document_id} processing failed: {result.get('error')}")
-    except Exception as e:
-        logger.error(f"Error in background processing for document {document_id}: {str(e)}")
+def _enqueue_processing(document_id: int, use_cache: bool = True) -> None:
+    """Queue a document on the worker"""
+    # Imported on first use: the worker module pulls in Celery and the whole
+    # pipeline, which API startup (and read-only pods) shouldn't pay for
+    from ..worker import enqueue_document_processing
+    
+    enqueue_document_processing(document_id, use_cache=use_cache)
 
 
 @router.get("/", response_model=DocumentListResponse)
 def list_documents(
-    skip: int = 0,
-    limit: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    include_transactions: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all documents for current user"""
+    """
+    List documents for current user, newest first
     
-    total = db.query(Document).filter(Document.user_id == current_user.id).count()
+    Uses keyset pagination on (created_at, id): pass the returned next_cursor
+    to get the following page. Per-document transaction count and total are
+    computed in SQL; transactions themselves are only loaded when
+    include_transactions is set.
+    """
     
-    documents = (
-        db.query(Document)
-        .options(joinedload(Document.transactions))
+    transaction_count = (
+        select(func.count(Transaction.id))
+        .where(Transaction.document_id == Document.id)
+        .correlate(Document)
+        .scalar_subquery()
+    )
+    transaction_total = (
+        select(func.coalesce(func.sum(Transaction.amount), 0))
+        .where(Transaction.document_id == Document.id)
+        .correlate(Document)
+        .scalar_subquery()
+    )
+    
+    query = (
+        db.query(Document, transaction_count, transaction_total)
+        .options(defer(Document.ocr_text), defer(Document.ocr_pages), defer(Document.extraction_data))
         .filter(Document.user_id == current_user.id)
-        .order_by(Document.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+    )
+    
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor, datetime.fromisoformat)
+        query = query.filter(tuple_(Document.created_at, Document.id) < tuple_(cursor_created_at, cursor_id))
+    
+    if include_transactions:
+        query = query.options(selectinload(Document.transactions))
+    
+    # Fetch one extra row to learn whether there is a next page
+    rows = (
+        query
+        .order_by(Document.created_at.desc(), Document.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    documents = []
+    for document, count, total in rows:
+        # Validate through DocumentSummary so document.transactions is never lazy-loaded
+        item = DocumentListItem(
+            **DocumentSummary.model_validate(document).model_dump(),
+            transaction_count=count,
+            transaction_total=float(total),
+            transactions=[TransactionResponse.model_validate(t) for t in document.transactions] if include_transactions else None
+        )
+        documents.append(item)
     
-    # DEBUG: Log transaction counts
-    for doc in documents:
-        logger.info(f"🔍 Document {doc.id}: {len(doc.transactions)} transactions")
+    next_cursor = encode_cursor(rows[-1][0].created_at, rows[-1][0].id) if has_more else None
     
-    return {"documents": documents, "total": total}
+    return {"documents": documents, "next_cursor": next_cursor}
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -150,6 +240,93 @@ def get_document(
     return document
 
 
+@router.get("/{document_id}/export")
+def export_document(
+    document_id: int,
+    format: ExportFormat = ExportFormat.CSV,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Export a document's transactions as a streamed CSV, OFX or QBO file"""
+    
+    document = db.query(Document.id, Document.filename).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    def build_query(query):
+        return query.filter(Transaction.document_id == document_id)
+    
+    filename = os.path.splitext(document.filename)[0] or f"document-{document_id}"
+    # The stream reads through its own session; give this connection back
+    # to the API pool now rather than when the download finishes
+    db.close()
+    return export_service.streaming_response(build_query, format, filename)
+
+
+@router.post("/{document_id}/reprocess", response_model=DocumentResponse, status_code=status.HTTP_202_ACCEPTED)
+def reprocess_document(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Resume processing a document from its first incomplete stage
+    
+    The document is claimed by moving it back to UPLOADED (queued) in a
+    single conditional UPDATE, so concurrent calls, or a call while the
+    document is still queued or processing, can never enqueue it twice.
+    """
+    
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    from ..services.processing_service import processing_service
+    
+    resume_stage = processing_service.first_incomplete_stage(document)
+    if resume_stage is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document is already fully processed"
+        )
+    
+    claimed = db.execute(
+        update(Document)
+        .where(
+            Document.id == document.id,
+            Document.status.notin_([DocumentStatus.UPLOADED, DocumentStatus.PROCESSING])
+        )
+        .values(status=DocumentStatus.UPLOADED, error_message=None)
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document is already queued or being processed"
+        )
+    db.commit()
+    db.refresh(document)
+    
+    logger.info(f"Reprocessing document {document_id} from stage '{resume_stage}'")
+    _enqueue_processing(document.id)
+    
+    return document
+
+
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_document(
     document_id: int,
@@ -169,9 +346,10 @@ def delete_document(
             detail="Document not found"
         )
     
-    # TODO: Delete file from S3/R2
-    if os.path.exists(document.file_path):
-        os.remove(document.file_path)
+    try:
+        get_storage().delete(document.file_path)
+    except Exception as e:
+        logger.warning(f"Failed to delete file for document {document_id}: {e}")
     
     db.delete(document)
     db.commit()
@@ -188,13 +366,13 @@ def delete_all_documents(
     
     documents = db.query(Document).filter(Document.user_id == current_user.id).all()
     
+    # Delete files in batches rather than one request per document
+    try:
+        get_storage().delete_many([document.file_path for document in documents])
+    except Exception as e:
+        logger.warning(f"Failed to delete files for user {current_user.id}: {e}")
+    
     for document in documents:
-        # Delete file if exists
-        if os.path.exists(document.file_path):
-            try:
-                os.remove(document.file_path)
-            except:
-                pass
         db.delete(document)
     
     db.commit()
@@ -0,0 +1,34 @@
+"""
+Keyset Pagination
+Opaque cursors for lists ordered by (sort value, id) instead of offset
+"""
+from fastapi import HTTPException, status
+from typing import Any, Callable, Tuple
+import base64
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    """Encode the (sort value, id) position of the last row on a page"""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, parse_sort_value: Callable[[str], Any]) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Args:
+        cursor: Cursor from a previous page
+        parse_sort_value: Parses the ISO formatted sort value, e.g. date.fromisoformat
+    
+    Returns:
+        tuple of (sort value, id)
+    """
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return parse_sort_value(sort_value), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -1,17 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import delete, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import date
+from typing import List, Optional
 
 from ..core.database import get_db
 from ..models.user import User
 from ..models.transaction import Transaction
 from ..models.document import Document
-from ..schemas.transaction import TransactionUpdate, TransactionBulkUpdate
+from ..schemas.transaction import (
+    TransactionUpdate, TransactionBulkUpdate, TransactionBulkDelete, TransactionListResponse, TransactionFilters
+)
 from ..schemas.document import TransactionResponse
 from .auth import get_current_user
+from .pagination import encode_cursor, decode_cursor
+from ..services.export_service import export_service, ExportFormat
+from ..services.merchant_memory import merchant_memory
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+# Ids per bulk statement; keeps bind parameter counts well under driver limits
+BULK_BATCH_SIZE = 10000
+
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_transactions(query, filters: TransactionFilters):
+    """Apply TransactionFilters to a query that selects from transactions"""
+    if filters.document_id is not None:
+        query = query.filter(Transaction.document_id == filters.document_id)
+    if filters.date_from is not None:
+        query = query.filter(Transaction.transaction_date >= filters.date_from)
+    if filters.date_to is not None:
+        query = query.filter(Transaction.transaction_date <= filters.date_to)
+    if filters.amount_min is not None:
+        query = query.filter(Transaction.amount >= filters.amount_min)
+    if filters.amount_max is not None:
+        query = query.filter(Transaction.amount <= filters.amount_max)
+    if filters.category is not None:
+        query = query.filter(Transaction.category == filters.category)
+    if filters.is_verified is not None:
+        query = query.filter(Transaction.is_verified == filters.is_verified)
+    if filters.synced is not None:
+        query = query.filter(Transaction.synced_to_quickbooks == filters.synced)
+    if filters.search:
+        query = query.filter(Transaction.description.ilike(f"%{_escape_like(filters.search)}%", escape="\\"))
+    return query
+
+
+@router.get("/", response_model=TransactionListResponse)
+def list_transactions(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    filters: TransactionFilters = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List transactions across all of the current user's documents, newest first
+    
+    Uses keyset pagination on (transaction_date, id): pass the returned
+    next_cursor to get the following page.
+    """
+    
+    # Filter on the denormalized user_id, so (user_id, transaction_date, id)
+    # serves both the filter and the order without touching documents
+    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    query = filter_transactions(query, filters)
+    
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor, date.fromisoformat)
+        query = query.filter(
+            tuple_(Transaction.transaction_date, Transaction.id) < tuple_(cursor_date, cursor_id)
+        )
+    
+    # Fetch one extra row to learn whether there is a next page
+    transactions = (
+        query
+        .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+    
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(transactions[-1].transaction_date, transactions[-1].id)
+    
+    return {"transactions": transactions, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+def export_transactions(
+    format: ExportFormat = ExportFormat.CSV,
+    filters: TransactionFilters = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Export the current user's transactions matching the filters
+    
+    The file is streamed straight from a server-side cursor, so exports of
+    any size run in constant memory.
+    """
+    user_id = current_user.id
+    # The stream reads through its own session; give the connection used
+    # for auth back to the API pool now rather than when the download finishes
+    db.close()
+    
+    def build_query(query):
+        query = query.filter(Transaction.user_id == user_id)
+        return filter_transactions(query, filters)
+    
+    return export_service.streaming_response(build_query, format, "transactions")
+
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def get_transaction(
@@ -70,6 +176,12 @@ def update_transaction(
     for field, value in update_dict.items():
         setattr(transaction, field, value)
     
+    # Remember the user's category for this merchant in future statements,
+    # once the user has verified it; unverified rows may still be the
+    # extractor's guess that nobody looked at
+    if ('category' in update_dict or update_dict.get('is_verified')) and transaction.is_verified:
+        merchant_memory.learn(db, current_user.id, [(transaction.description, transaction.category)])
+    
     db.commit()
     db.refresh(transaction)
     
@@ -106,41 +218,95 @@ def delete_transaction(
     return None
 
 
+def _owned_by(user_id: int):
+    """Restrict a transactions statement to the user's own rows"""
+    return Transaction.user_id == user_id
+
+
+def _batches(ids: List[int]):
+    """Split an id list into BULK_BATCH_SIZE chunks, dropping duplicates"""
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), BULK_BATCH_SIZE):
+        yield ids[i:i + BULK_BATCH_SIZE]
+
+
 @router.post("/bulk-update", response_model=List[TransactionResponse])
 def bulk_update_transactions(
     bulk_data: TransactionBulkUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Bulk update multiple transactions"""
+    """
+    Bulk update multiple transactions
     
-    transactions = (
-        db.query(Transaction)
-        .join(Document)
-        .filter(
-            Transaction.id.in_(bulk_data.transaction_ids),
-            Document.user_id == current_user.id
+    Runs one UPDATE ... RETURNING per BULK_BATCH_SIZE ids, so the updated
+    rows come back from the same round trip.
+    """
+    
+    values = bulk_data.model_dump(exclude_none=True, exclude={"transaction_ids"})
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update"
+        )
+    
+    transactions = []
+    for batch in _batches(bulk_data.transaction_ids):
+        statement = (
+            update(Transaction)
+            .where(Transaction.id.in_(batch), _owned_by(current_user.id))
+            .values(**values)
+            .returning(Transaction)
+        )
+        transactions.extend(
+            db.scalars(statement, execution_options={"synchronize_session": False}).all()
         )
-        .all()
-    )
     
     if not transactions:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No transactions found"
         )
     
-    # Update all transactions
-    for transaction in transactions:
-        if bulk_data.category is not None:
-            transaction.category = bulk_data.category
-        if bulk_data.is_verified is not None:
-            transaction.is_verified = bulk_data.is_verified
+    # Learn only from verified rows, as in update_transaction
+    if bulk_data.category or bulk_data.is_verified:
+        merchant_memory.learn(db, current_user.id, [
+            (transaction.description, transaction.category)
+            for transaction in transactions
+            if transaction.is_verified
+        ])
     
+    # Serialize before commit expires the rows, which would cost a SELECT each
+    response = [TransactionResponse.model_validate(transaction) for transaction in transactions]
     db.commit()
     
-    # Refresh all
-    for transaction in transactions:
-        db.refresh(transaction)
+    return response
+
+
+@router.post("/bulk-delete")
+def bulk_delete_transactions(
+    bulk_data: TransactionBulkDelete,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk delete multiple transactions, one DELETE per BULK_BATCH_SIZE ids"""
+    
+    deleted_count = 0
+    for batch in _batches(bulk_data.transaction_ids):
+        result = db.execute(
+            delete(Transaction).where(Transaction.id.in_(batch), _owned_by(current_user.id)),
+            execution_options={"synchronize_session": False}
+        )
+        deleted_count += result.rowcount
+    
+    if not deleted_count:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No transactions found"
+        )
+    
+    db.commit()
     
-    return transactions
+    return {"deleted_count": deleted_count}
@@ -0,0 +1,75 @@
+"""
+Shared cache helpers
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis_client():
+    """
+    Get the shared Redis client for REDIS_URL
+    
+    The client connects lazily, so callers must still handle connection
+    errors on each command. Returns None if the redis package is missing.
+    """
+    global _redis_client
+    
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    import redis
+                except ImportError:
+                    logger.warning("redis package not installed; Redis caching disabled")
+                    return None
+                _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    
+    return _redis_client
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ttl_seconds"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a live entry, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used one when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, key: Hashable) -> None:
+        """Drop an entry if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
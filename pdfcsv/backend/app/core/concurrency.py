@@ -0,0 +1,76 @@
+"""
+Concurrency helpers shared across event loops
+"""
+import asyncio
+import threading
+from collections import deque
+
+
+class ProcessSemaphore:
+    """
+    Async semaphore shared by every event loop in the process
+    
+    asyncio.Semaphore is bound to one loop, and each Celery worker thread
+    runs its own, so a per-loop limit is multiplied by the thread count.
+    Here the count lives behind a thread lock; a waiter parks on a future of
+    its own loop and is woken thread-safely when a slot frees up. Waiters are
+    served in arrival order.
+    """
+    
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = deque()  # (loop, future) per parked acquire
+        self._lock = threading.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait for a slot"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            # A slot handed to us before the cancellation landed must be passed on;
+            # one still on its way is passed on by _wake, which finds the future cancelled
+            if handed_over and future.done() and not future.cancelled():
+                self.release()
+            raise
+    
+    def release(self) -> None:
+        """Free a slot, handing it straight to the longest waiting acquire if any"""
+        with self._lock:
+            if not self._waiters:
+                self._value += 1
+                return
+            loop, future = self._waiters.popleft()
+        
+        try:
+            loop.call_soon_threadsafe(self._wake, future)
+        except RuntimeError:
+            # The waiter's loop is closed; give the slot to someone else
+            self.release()
+    
+    def _wake(self, future: asyncio.Future) -> None:
+        """Runs on the waiter's loop: give it the slot, or pass the slot on if it gave up"""
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+    
+    async def __aenter__(self) -> "ProcessSemaphore":
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
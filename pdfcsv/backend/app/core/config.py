@@ -8,20 +8,73 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql://localhost:5432/postgres"
     REDIS_URL: str = "redis://localhost:6379"
+    DB_POOL_SIZE: int = 10  # Per process, for request handling
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 10  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_PGBOUNCER: bool = False  # Behind PgBouncer: don't pool in-process
+    DB_ECHO: bool = False  # Log every SQL statement
+    PIPELINE_DB_POOL_SIZE: int = 2  # Separate pool for document processing
+    PIPELINE_DB_MAX_OVERFLOW: int = 2
+    EXPORT_DB_POOL_SIZE: int = 2  # Separate pool for streamed exports
+    EXPORT_DB_MAX_OVERFLOW: int = 2
+    
+    # Task queue
+    CELERY_BROKER_URL: Optional[str] = None  # Defaults to REDIS_URL; "memory://" for tests
+    CELERY_TASK_ALWAYS_EAGER: bool = False  # Run tasks inline instead of on a worker
+    WORKER_CONCURRENCY: int = 2  # Documents processed at once per worker
+    PROCESSING_MAX_RETRIES: int = 3
+    PROCESSING_RETRY_BACKOFF_SECONDS: int = 30
     
     # Security
     SECRET_KEY: str = "default-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
+    BCRYPT_ROUNDS: int = 12  # Work factor; existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = 2  # Threads reserved for bcrypt, apart from request handling
+    USER_CACHE_TTL_SECONDS: int = 30  # How long auth may serve a stale user row
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_REDIS: bool = False  # Share cached users across processes via REDIS_URL
     
     # OpenAI
     OPENAI_API_KEY: str = "sk-fake-openai-key"
+    OPENAI_BASE_URL: Optional[str] = None  # Point at a local fake server for offline runs
+    EXTRACTION_CHUNK_CHARS: int = 8000
+    EXTRACTION_CHUNK_OVERLAP_LINES: int = 3
+    EXTRACTION_MAX_CONCURRENCY: int = 4  # Concurrent GPT calls per process, across all worker threads
+    LLM_CACHE_ENABLED: bool = True  # Reuse responses to identical GPT requests
+    LLM_CACHE_TTL_SECONDS: int = 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+    RULE_PARSER_MIN_CONFIDENCE: int = 90  # Below this, fall back to GPT extraction
+    RULE_PARSER_TEMPLATES_PATH: Optional[str] = None  # JSON list of per-bank layout templates
+    CATEGORY_RULES_PATH: Optional[str] = None  # JSON list of keyword category rules (replaces built-ins)
+    MERCHANT_MEMORY_MAX_USERS: int = 1000  # Users whose learned merchants stay in memory
+    MERCHANT_MEMORY_TTL_SECONDS: int = 300  # How long other processes may miss a new correction
+    CATEGORIZATION_LLM_ENABLED: bool = True  # Second-pass GPT categorization of low-confidence rows
+    CATEGORIZATION_FAKE_LLM: bool = False  # Deterministic offline model for tests
+    CATEGORIZATION_MODEL: str = "gpt-4o-mini"
+    CATEGORIZATION_MIN_CONFIDENCE: int = 60  # Rows below this go to the model
+    CATEGORIZATION_BATCH_SIZE: int = 50  # Descriptions per prompt
+    CATEGORIZATION_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    CATEGORIZATION_CACHE_MAX_ENTRIES: int = 100000
+    CATEGORIZATION_CACHE_REDIS: bool = False  # Share answers across processes via REDIS_URL
     
     # AWS
     AWS_ACCESS_KEY_ID: str = "fake-aws-key"
     AWS_SECRET_ACCESS_KEY: str = "fake-aws-secret"
     AWS_REGION: str = "us-east-1"
     
+    # OCR
+    OCR_WORKERS: int = 4  # Tesseract worker processes per service (1 = serial)
+    OCR_DPI: int = 300
+    OCR_MAX_INFLIGHT_PAGES: int = 4  # Pages rasterized/queued at once per document
+    OCR_USE_TEXT_LAYER: bool = True  # Read native PDF text instead of OCR where present
+    OCR_TEXT_LAYER_MIN_CHARS: int = 200  # Below this a page is treated as scanned
+    OCR_SCANNED_IMAGE_COVERAGE: float = 0.5  # Pages at least this much covered by images are OCR'd
+    OCR_CACHE_BACKEND: str = "disk"  # "disk", "redis" or "none"
+    OCR_CACHE_DIR: str = ".cache/ocr"
+    OCR_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    
     # Stripe
     STRIPE_SECRET_KEY: str = "sk_test_fake"
     STRIPE_PUBLISHABLE_KEY: str = "pk_test_fake"
@@ -38,6 +91,9 @@ class Settings(BaseSettings):
     RESEND_API_KEY: Optional[str] = None
     
     # Storage
+    STORAGE_BACKEND: str = "local"  # "local" or "s3" (any S3-compatible endpoint)
+    LOCAL_STORAGE_ROOT: str = "."  # Keys look like uploads/<uuid>.pdf
+    S3_MULTIPART_PART_SIZE_MB: int = 8  # S3 minimum is 5
     S3_BUCKET_NAME: str = "finflow-documents"
     S3_ACCESS_KEY: Optional[str] = None
     S3_SECRET_KEY: Optional[str] = None
@@ -48,8 +104,11 @@ class Settings(BaseSettings):
     FRONTEND_URL: str = "http://localhost:3000"
     BACKEND_URL: str = "http://localhost:8000"
     ENVIRONMENT: str = "development"
+    MIGRATE_ON_STARTUP: bool = True  # start.py/start.sh apply migrations before serving the API
+    METRICS_ENABLED: bool = False  # Serve /metrics; keep it off where the API is public
     
     # Usage limits
+    MAX_UPLOAD_SIZE_MB: int = 10
     FREE_TIER_PAGES_PER_MONTH: int = 100
     PRO_TIER_PAGES_PER_YEAR: int = 7500
     
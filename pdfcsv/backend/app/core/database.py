@@ -1,17 +1,99 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+import threading
+import time
 from .config import settings
 
-# Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.ENVIRONMENT == "development"
-)
 
-# Create session factory
+class PoolStats:
+    """Connection checkout wait-time counters for one engine"""
+    
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+    
+    def snapshot(self) -> dict:
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(1000 * self.total_wait / self.checkouts, 2) if self.checkouts else 0.0,
+            'max_wait_ms': round(1000 * self.max_wait, 2)
+        }
+
+
+# Keyed by pool logging name, which survives pool.recreate() on dispose
+_pool_stats = {}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+    
+    def _do_get(self):
+        stats = _pool_stats[self._orig_logging_name]
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        stats.record(time.perf_counter() - start)
+        return connection
+
+
+def _create_engine(name: str, pool_size: int, max_overflow: int):
+    """
+    Create an engine with its own connection pool
+    
+    In PgBouncer mode the bouncer does the pooling, so connections are opened
+    per checkout (NullPool) rather than pooled twice.
+    """
+    if settings.DB_PGBOUNCER:
+        return create_engine(settings.DATABASE_URL, poolclass=NullPool, echo=settings.DB_ECHO)
+    
+    _pool_stats[name] = PoolStats()
+    return create_engine(
+        settings.DATABASE_URL,
+        poolclass=TimedQueuePool,
+        pool_logging_name=name,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        echo=settings.DB_ECHO
+    )
+
+
+# Create database engine for request handling
+engine = _create_engine("api", settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+
+# Separate engine for document processing, so long-running pipeline work
+# can never take the connections requests need
+pipeline_engine = _create_engine("pipeline", settings.PIPELINE_DB_POOL_SIZE, settings.PIPELINE_DB_MAX_OVERFLOW)
+
+# Streamed exports hold a connection for as long as the client downloads,
+# so they get their own pool too
+export_engine = _create_engine("export", settings.EXPORT_DB_POOL_SIZE, settings.EXPORT_DB_MAX_OVERFLOW)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PipelineSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=pipeline_engine)
+ExportSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=export_engine)
 
 # Base class for models
 Base = declarative_base()
@@ -24,3 +106,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def pool_stats() -> dict:
+    """Pool occupancy and checkout wait times per engine"""
+    stats = {}
+    for name, pool_engine in (("api", engine), ("pipeline", pipeline_engine), ("export", export_engine)):
+        pool = pool_engine.pool
+        if not isinstance(pool, QueuePool):
+            stats[name] = {'pool': 'none (pgbouncer)'}
+            continue
+        stats[name] = {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            **_pool_stats[name].snapshot()
+        }
+    return stats
@@ -1,11 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+import sys
 from .core.config import settings
-from .core.database import engine, Base
+from .core.database import pool_stats
+from .core.upload_limit import UploadSizeLimitMiddleware
 from .api import auth, documents, transactions
+from .services.user_cache import user_cache
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic (`alembic upgrade head`), not created at import
 
 # Create FastAPI app
 app = FastAPI(
@@ -14,6 +16,15 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# Refuse oversized uploads before the multipart body is read. Added before
+# CORS, so CORS wraps it (the last middleware added is the outermost) and the
+# early 413 still carries the CORS headers the browser needs to read it
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths={"/documents/upload"},
+    max_bytes=settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,3 +58,41 @@ def health_check():
         "environment": settings.ENVIRONMENT,
         "database": "connected"
     }
+
+
+def _existing_service(module_name: str, getter_name: str):
+    """
+    The shared instance behind a services module's lru_cache getter, if any
+    
+    Reading stats must not load or construct the pipeline services (OpenAI
+    and OCR clients, Redis connections) in a process that hasn't used them,
+    so services that don't exist yet are reported as None.
+    """
+    module = sys.modules.get(f"{__package__}.services.{module_name}")
+    if module is None:
+        return None
+    getter = getattr(module, getter_name)
+    return getter() if getter.cache_info().currsize else None
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Cache, pipeline and connection pool counters for this process
+    
+    Off unless METRICS_ENABLED, since it describes the deployment to anyone
+    who can reach the API; scrape it from inside the network.
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    ocr_cache_module = sys.modules.get(f"{__package__}.services.ocr_cache")
+    extraction_service = _existing_service("extraction_service", "get_extraction_service")
+    llm_categorizer = _existing_service("llm_categorizer", "get_llm_categorizer")
+    return {
+        "ocr_cache": ocr_cache_module.ocr_cache.stats() if ocr_cache_module else None,
+        "extraction": extraction_service.stats() if extraction_service else None,
+        "llm_categorizer": llm_categorizer.stats() if llm_categorizer else None,
+        "user_cache": user_cache.stats(),
+        "database": pool_stats()
+    }
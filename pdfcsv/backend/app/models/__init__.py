@@ -1,6 +1,7 @@
 from .user import User, SubscriptionTier
 from .document import Document, DocumentStatus, DocumentType
 from .transaction import Transaction
+from .merchant_category import MerchantCategory
 
 __all__ = [
     "User",
@@ -9,4 +10,5 @@ __all__ = [
     "DocumentStatus",
     "DocumentType",
     "Transaction",
+    "MerchantCategory",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -23,6 +23,12 @@ class DocumentType(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Duplicate-upload lookup
+        Index("ix_documents_user_id_content_hash", "user_id", "content_hash"),
+        # Keyset pagination of a user's documents
+        Index("ix_documents_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -32,6 +38,7 @@ class Document(Base):
     file_path = Column(String, nullable=False)  # S3/R2 path
     file_size = Column(Integer, nullable=False)  # bytes
     mime_type = Column(String, default="application/pdf")
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the file, hex
     page_count = Column(Integer, default=1)
     
     # Processing
@@ -42,6 +49,10 @@ class Document(Base):
     # OCR results
     ocr_text = Column(Text, nullable=True)
     ocr_confidence = Column(Integer, nullable=True)  # 0-100
+    ocr_pages = Column(Text, nullable=True)  # Per-page method and confidence (JSON)
+    
+    # Extraction checkpoint (JSON), so saving can resume without re-running GPT
+    extraction_data = Column(Text, nullable=True)
     
     # QuickBooks sync
     synced_to_quickbooks = Column(Boolean, default=False)
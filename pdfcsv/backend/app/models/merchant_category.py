@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class MerchantCategory(Base):
+    """A category a user has assigned to a normalized merchant name"""
+    __tablename__ = "merchant_categories"
+    __table_args__ = (
+        UniqueConstraint("user_id", "merchant", name="uq_merchant_categories_user_id_merchant"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    
+    merchant = Column(String, nullable=False)  # See merchant_memory.merchant_key
+    category = Column(String, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import DDL, event, Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -6,9 +6,29 @@ from ..core.database import Base
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Per-document lookups in date order
+        Index("ix_transactions_document_id_transaction_date_id", "document_id", "transaction_date", "id"),
+        # Date-ordered listing across all of a user's documents (GET /transactions, exports)
+        Index("ix_transactions_user_id_transaction_date_id", "user_id", "transaction_date", "id"),
+        # Category filter within a user's transactions, in the same order
+        Index(
+            "ix_transactions_user_id_category_transaction_date_id",
+            "user_id", "category", "transaction_date", "id"
+        ),
+        # Substring search on description (pg_trgm, PostgreSQL only)
+        Index(
+            "ix_transactions_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"}
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    # Copy of documents.user_id, so per-user queries need no join to documents
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Transaction data
     transaction_date = Column(Date, nullable=False)
@@ -39,3 +59,11 @@ class Transaction(Base):
     
     # Relationships
     document = relationship("Document", back_populates="transactions")
+
+
+# create_all needs pg_trgm for the description index (migrations enable it themselves)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -31,6 +31,9 @@ class User(Base):
     quickbooks_refresh_token = Column(String, nullable=True)
     quickbooks_token_expires_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Categorization: JSON list of keyword rules tried before the defaults
+    category_rules = Column(Text, nullable=True)
+    
     # Usage tracking
     pages_processed_this_month = Column(Integer, default=0)
     pages_processed_total = Column(Integer, default=0)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, field_validator
 from typing import Optional, List
+import json
 from datetime import datetime, date
 from ..models.document import DocumentStatus, DocumentType
 
@@ -38,7 +39,7 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 
-class DocumentResponse(DocumentBase):
+class DocumentSummary(DocumentBase):
     id: int
     status: DocumentStatus
     document_type: DocumentType
@@ -50,12 +51,36 @@ class DocumentResponse(DocumentBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     processed_at: Optional[datetime] = None
-    transactions: List[TransactionResponse] = []
     
     class Config:
         from_attributes = True
 
 
+class OCRPageResponse(BaseModel):
+    page: int
+    method: str  # text_layer, tesseract or textract
+    confidence: int
+
+
+class DocumentResponse(DocumentSummary):
+    ocr_pages: Optional[List[OCRPageResponse]] = None
+    transactions: List[TransactionResponse] = []
+    
+    @field_validator('ocr_pages', mode='before')
+    @classmethod
+    def parse_ocr_pages(cls, v):
+        """Parse the JSON stored on the document"""
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
+
+
+class DocumentListItem(DocumentSummary):
+    transaction_count: int = 0
+    transaction_total: float = 0.0
+    transactions: Optional[List[TransactionResponse]] = None  # Only when requested
+
+
 class DocumentListResponse(BaseModel):
-    documents: List[DocumentResponse]
-    total: int
+    documents: List[DocumentListItem]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date
+from .document import TransactionResponse
 
 
 class TransactionUpdate(BaseModel):
@@ -17,3 +18,25 @@ class TransactionBulkUpdate(BaseModel):
     transaction_ids: list[int]
     category: Optional[str] = None
     is_verified: Optional[bool] = None
+
+
+class TransactionBulkDelete(BaseModel):
+    transaction_ids: list[int]
+
+
+class TransactionListResponse(BaseModel):
+    transactions: List[TransactionResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+
+class TransactionFilters(BaseModel):
+    """Query filters shared by the transaction list and export endpoints"""
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    amount_min: Optional[float] = None
+    amount_max: Optional[float] = None
+    category: Optional[str] = None
+    is_verified: Optional[bool] = None
+    synced: Optional[bool] = None
+    search: Optional[str] = None  # Case-insensitive substring of the description
+    document_id: Optional[int] = None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, computed_field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import List, Optional
 from datetime import datetime
 from ..models.user import SubscriptionTier
 
@@ -39,6 +39,14 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class CategoryRuleSchema(BaseModel):
+    category: str
+    keywords: List[str] = Field(min_length=1)
+    priority: int = 0  # Higher wins when several of the user's rules match; all outrank the built-ins
+    whole_word: bool = True  # Match keywords on word boundaries only
+    confidence: int = Field(80, ge=0, le=100)  # Below CATEGORIZATION_MIN_CONFIDENCE the LLM re-checks
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -0,0 +1,190 @@
+"""
+Keyword Transaction Categorizer
+Data-driven category rules compiled into a single regular expression, so a
+description is scanned once no matter how many rules there are
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import functools
+import json
+import logging
+import re
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = 'Uncategorized'
+# Default confidence (0-100) for a keyword match
+KEYWORD_CONFIDENCE = 80
+
+
+class CategoryRule:
+    """
+    Keywords that put a transaction in a category
+    
+    When rules for different categories match the same description, the
+    highest priority wins (ties go to the rule listed first). whole_word
+    keywords only match on word boundaries, so 'gas' matches "SHELL GAS #12"
+    but not "LAS VEGAS". confidence is what a match is worth; generic
+    keywords get less, so the LLM stage takes a second look.
+    """
+    
+    def __init__(
+        self,
+        category: str,
+        keywords: Sequence[str],
+        priority: int = 0,
+        whole_word: bool = True,
+        confidence: int = KEYWORD_CONFIDENCE
+    ):
+        self.category = category
+        self.keywords = [keyword.lower() for keyword in keywords if keyword.strip()]
+        self.priority = priority
+        self.whole_word = whole_word
+        self.confidence = confidence
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "CategoryRule":
+        """Build a rule from config (see CATEGORY_RULES_PATH) or a user's rules"""
+        return cls(
+            category=data['category'],
+            keywords=data['keywords'],
+            priority=data.get('priority', 0),
+            whole_word=data.get('whole_word', True),
+            confidence=data.get('confidence', KEYWORD_CONFIDENCE)
+        )
+
+
+# Substring matches, as the original if/elif chain did: statements glue
+# words together ("WHOLEFOODS", "CHEVRON12345") and pluralize them
+# ("ONLINE PAYMENTS"), which word-boundary matching would miss
+DEFAULT_RULES = [
+    CategoryRule('Shopping', ['amazon', 'walmart', 'target', 'store'], priority=60, whole_word=False),
+    CategoryRule('Dining', ['restaurant', 'food', 'cafe', 'starbucks'], priority=50, whole_word=False),
+    CategoryRule('Transportation', ['gas', 'fuel', 'shell', 'chevron'], priority=40, whole_word=False),
+    CategoryRule('Utilities', ['utility', 'electric', 'water', 'internet'], priority=30, whole_word=False),
+    CategoryRule('Income', ['payroll', 'salary', 'deposit'], priority=20, whole_word=False),
+    CategoryRule('Transfer', ['transfer', 'payment'], priority=10, whole_word=False, confidence=50),
+]
+
+
+def _trie_pattern(node: dict, markers: List[int]) -> str:
+    """
+    Render a keyword trie as a regex
+    
+    Common prefixes are shared, so the engine walks the trie instead of trying
+    every keyword at every position. Each keyword ends in an empty marker
+    group; markers[n - 1] is the keyword index for group n. Longer keywords
+    are tried before their prefixes.
+    """
+    alternatives = []
+    for char in sorted(key for key in node if key):
+        alternatives.append(re.escape(char) + _trie_pattern(node[char], markers))
+    if '' in node:
+        markers.append(node[''])
+        alternatives.append('()')
+    
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+
+class Categorizer:
+    """
+    Assigns categories from a fixed set of rules
+    
+    All keywords are compiled into one trie-shaped alternation inside a
+    lookahead, so a single pass over the description finds the keyword
+    starting at every position, overlaps included. At any one position the
+    longest keyword is taken; across positions the highest priority rule
+    wins. Override rules (a user's own) outrank every base rule whatever
+    the priorities, and are ordered by priority among themselves.
+    """
+    
+    def __init__(self, rules: Iterable[CategoryRule], overrides: Iterable[CategoryRule] = ()):
+        # Rank overrides first, then by priority; a lower rank wins, ties keep rule order
+        tiered = [(0, rule) for rule in overrides] + [(1, rule) for rule in rules]
+        ordered = sorted(enumerate(tiered), key=lambda item: (item[1][0], -item[1][1].priority, item[0]))
+        ordered = [(index, rule) for index, (_, rule) in ordered]
+        
+        self.categories = list(dict.fromkeys(rule.category for _, rule in ordered))
+        self._keywords = []  # (rank, category, confidence) per keyword
+        whole_word_trie = {}
+        substring_trie = {}
+        for rank, (_, rule) in enumerate(ordered):
+            node = whole_word_trie if rule.whole_word else substring_trie
+            for keyword in rule.keywords:
+                leaf = node
+                for char in keyword:
+                    leaf = leaf.setdefault(char, {})
+                # The same keyword in a lower priority rule can never win
+                if '' not in leaf:
+                    leaf[''] = len(self._keywords)
+                    self._keywords.append((rank, rule.category, rule.confidence))
+        
+        self._markers: List[int] = []
+        branches = []
+        if whole_word_trie:
+            branches.append(rf"\b{_trie_pattern(whole_word_trie, self._markers)}\b")
+        if substring_trie:
+            branches.append(_trie_pattern(substring_trie, self._markers))
+        self._regex = re.compile(f"(?=(?:{'|'.join(branches)}))") if branches else None
+    
+    def classify(self, description: str) -> Tuple[str, int]:
+        """Get the category and its confidence (0 when uncategorized) for one description"""
+        if self._regex is None:
+            return UNCATEGORIZED, 0
+        
+        best = None
+        for match in self._regex.finditer(description.lower()):
+            # Exactly one keyword's marker group takes part in each match
+            keyword = self._keywords[self._markers[match.lastindex - 1]]
+            if best is None or keyword[0] < best[0]:
+                best = keyword
+                if best[0] == 0:
+                    break
+        
+        return (best[1], best[2]) if best else (UNCATEGORIZED, 0)
+    
+    def classify_many(self, descriptions: Iterable[str]) -> List[Tuple[str, int]]:
+        """Get (category, confidence) for a batch of descriptions, in order"""
+        return [self.classify(description) for description in descriptions]
+    
+    def categorize(self, description: str) -> str:
+        """Get the category for one description"""
+        return self.classify(description)[0]
+    
+    def categorize_many(self, descriptions: Iterable[str]) -> List[str]:
+        """Get categories for a batch of descriptions, in order"""
+        return [self.categorize(description) for description in descriptions]
+
+
+def _load_configured_rules() -> List[CategoryRule]:
+    """Rules from CATEGORY_RULES_PATH, or the built-in defaults"""
+    if settings.CATEGORY_RULES_PATH:
+        try:
+            with open(settings.CATEGORY_RULES_PATH) as f:
+                return [CategoryRule.from_dict(data) for data in json.load(f)]
+        except Exception as e:
+            logger.warning(f"Failed to load category rules: {e}. Using built-in rules.")
+    return list(DEFAULT_RULES)
+
+
+@functools.lru_cache(maxsize=256)
+def get_categorizer(user_rules: Optional[str] = None) -> Categorizer:
+    """
+    Get a compiled categorizer for the configured rules plus a user's own
+    
+    Args:
+        user_rules: The user's rules as stored on User.category_rules (JSON);
+            they outrank the configured rules, whatever their priority
+    
+    Compiled categorizers are cached by the rules JSON, so a user's rules are
+    compiled once and recompiled only after they change.
+    """
+    rules = []
+    if user_rules:
+        try:
+            rules = [CategoryRule.from_dict(data) for data in json.loads(user_rules)]
+        except Exception as e:
+            logger.warning(f"Ignoring invalid user category rules: {e}")
+    return Categorizer(_load_configured_rules(), overrides=rules)
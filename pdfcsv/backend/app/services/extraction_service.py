@@ -2,55 +2,109 @@
 OpenAI GPT-4 Extraction Service
 Extracts and categorizes transactions from OCR text
 """
-from openai import OpenAI
-from typing import List, Dict, Optional
+from collections import Counter
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
 import json
+import logging
+import textwrap
+import threading
+import weakref
+from ..core.cache import TTLCache
+from ..core.concurrency import ProcessSemaphore
 from ..core.config import settings
+from .statement_parser import statement_parser
+from .categorizer import Categorizer, get_categorizer
+from .merchant_memory import LEARNED_CONFIDENCE, merchant_memory
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_MODEL = "gpt-4-turbo-preview"
+EXTRACTION_SYSTEM_PROMPT = (
+    "You are an expert at extracting financial transactions from bank statements. "
+    "Extract all transactions with date, description, amount, and balance. Return ONLY valid JSON."
+)
 
 
 class ExtractionService:
     """Service for extracting transactions using OpenAI GPT-4"""
     
     def __init__(self):
-        """Initialize OpenAI client"""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        """Initialize per-event-loop OpenAI clients and process-wide concurrency state"""
+        # Async clients are bound to the loop that first uses them, and
+        # worker threads each run their own loop
+        self._clients = weakref.WeakKeyDictionary()
+        # One limit for the whole process, however many worker threads (loops) there are
+        self._semaphore = ProcessSemaphore(settings.EXTRACTION_MAX_CONCURRENCY)
+        # GPT calls in flight, by cache key; concurrent futures so callers on
+        # any thread's loop can wait on them (asyncio.wrap_future)
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._response_cache = TTLCache(settings.LLM_CACHE_MAX_ENTRIES, settings.LLM_CACHE_TTL_SECONDS)
+        self.method_counts = Counter()
+        self.llm_counts = Counter()  # requests, calls, hits, coalesced, tokens, saved_tokens
+        self._stats_lock = threading.Lock()
     
-    def extract_transactions(self, ocr_text: str) -> dict:
+    async def extract_transactions(
+        self,
+        ocr_text: str,
+        categorizer: Optional[Categorizer] = None,
+        merchant_categories: Optional[Dict[str, str]] = None,
+        use_cache: bool = True
+    ) -> dict:
         """
-        Extract transactions from OCR text using GPT-4
+        Extract transactions from OCR text
+        
+        Regular columnar statements are parsed locally; anything the rule-based
+        parser can't read with high confidence goes to GPT-4. Long statements
+        are split into overlapping chunks that are extracted concurrently and
+        merged, instead of being truncated.
         
         Args:
             ocr_text: Raw text extracted from bank statement
+            categorizer: Keyword categorizer to use, e.g. one with the
+                user's own rules; defaults to the configured rules
+            merchant_categories: The user's learned merchant -> category
+                map, applied before any keyword rule
+            use_cache: False to make fresh GPT calls instead of reusing
+                cached or in-flight replies
             
         Returns:
             dict with transactions list and metadata
         """
         try:
-            # Create prompt for GPT-4
-            prompt = self._create_extraction_prompt(ocr_text)
+            parsed = await asyncio.to_thread(statement_parser.parse, ocr_text)
             
-            # Call GPT-4
-            response = self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are an expert at extracting financial transactions from bank statements. Extract all transactions with date, description, amount, and balance. Return ONLY valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
+            if parsed['confidence'] >= settings.RULE_PARSER_MIN_CONFIDENCE:
+                logger.info(
+                    f"Rule-based parser matched {len(parsed['transactions'])} transactions "
+                    f"({parsed['template']}, {parsed['confidence']}% confidence)"
+                )
+                method = 'rule_based'
+                raw_transactions = parsed['transactions']
+            else:
+                method = 'llm'
+                raw_transactions = await self._extract_with_llm(ocr_text, use_cache)
             
-            # Parse response
-            result = json.loads(response.choices[0].message.content)
+            self._record_method(method)
             
             # Validate and categorize transactions
-            transactions = self._validate_and_categorize(result.get('transactions', []))
+            transactions = self._validate_and_categorize(
+                raw_transactions, categorizer or get_categorizer(), merchant_categories or {}
+            )
             
             return {
                 'transactions': transactions,
                 'success': True,
                 'error': None,
-                'document_type': self._detect_document_type(ocr_text)
+                'document_type': self._detect_document_type(ocr_text),
+                'extraction_method': method
             }
             
         except Exception as e:
@@ -58,8 +112,263 @@ class ExtractionService:
                 'transactions': [],
                 'success': False,
                 'error': str(e),
-                'document_type': 'UNKNOWN'
+                'document_type': 'UNKNOWN',
+                'extraction_method': None
+            }
+    
+    def stats(self) -> dict:
+        """Share of documents handled by each extraction path, and GPT response cache counters, in this process"""
+        with self._stats_lock:
+            counts = dict(self.method_counts)
+            llm = dict(self.llm_counts)
+        total = sum(counts.values())
+        requests = llm.get('requests', 0)
+        reused = llm.get('hits', 0) + llm.get('coalesced', 0)
+        return {
+            'documents': total,
+            'by_method': counts,
+            'share': {method: round(count / total, 4) for method, count in counts.items()} if total else {},
+            'llm_cache': {
+                'entries': len(self._response_cache),
+                'requests': requests,
+                'calls': llm.get('calls', 0),
+                'hits': llm.get('hits', 0),
+                'coalesced': llm.get('coalesced', 0),
+                'hit_rate': round(reused / requests, 4) if requests else 0.0,
+                'tokens': llm.get('tokens', 0),
+                'saved_tokens': llm.get('saved_tokens', 0)
             }
+        }
+    
+    def _record_method(self, method: str) -> None:
+        """Count which extraction path handled a document"""
+        with self._stats_lock:
+            self.method_counts[method] += 1
+    
+    def _record_llm(self, outcome: str, tokens: int) -> None:
+        """Count a GPT request: a real call, a cache hit, or one coalesced into another's call"""
+        with self._stats_lock:
+            self.llm_counts['requests'] += 1
+            self.llm_counts[outcome] += 1
+            self.llm_counts['tokens' if outcome == 'calls' else 'saved_tokens'] += tokens
+    
+    def _get_client(self) -> "AsyncOpenAI":
+        """Get the OpenAI client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+            
+            client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+            self._clients[loop] = client
+        return client
+    
+    async def _extract_with_llm(self, ocr_text: str, use_cache: bool = True) -> List[Dict]:
+        """Extract raw transactions with GPT-4, chunking long statements"""
+        chunks = self._chunk_text(ocr_text)
+        
+        if len(chunks) == 1:
+            return await self._extract_chunk(chunks[0], use_cache)
+        
+        logger.info(f"Extracting {len(chunks)} chunks ({len(ocr_text)} characters)")
+        # gather() returns chunk results in chunk order
+        chunk_results = await asyncio.gather(*(self._extract_chunk(chunk, use_cache) for chunk in chunks))
+        return self._merge_chunk_transactions(chunk_results)
+    
+    async def complete_json(
+        self, model: str, system_prompt: str, prompt: str, temperature: float, use_cache: bool = True
+    ) -> dict:
+        """
+        Run one JSON-mode chat completion and parse the reply
+        
+        Every GPT call in the pipeline goes through here, so they all share
+        the per-process concurrency limit and the response cache. A request
+        identical to a recent one (same model, prompts and temperature) is
+        answered from the cache, and one identical to a call still in flight
+        anywhere in the process (any worker thread's event loop) waits for
+        that call instead of making its own.
+        
+        With use_cache=False the call is always made; its reply still
+        replaces the cached one.
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            content, tokens = await self._create_completion(model, system_prompt, prompt, temperature)
+            self._record_llm('calls', tokens)
+            return json.loads(content)
+        
+        key = hashlib.sha256(
+            json.dumps([model, system_prompt, prompt, temperature]).encode('utf-8')
+        ).hexdigest()
+        
+        if not use_cache:
+            content, tokens = await self._create_completion(model, system_prompt, prompt, temperature)
+            result = json.loads(content)
+            self._response_cache.set(key, (content, tokens))
+            self._record_llm('calls', tokens)
+            return result
+        
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            content, tokens = cached
+            self._record_llm('hits', tokens)
+            return json.loads(content)
+        
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                # The leader may have finished since the lookup above
+                cached = self._response_cache.get(key)
+                if cached is None:
+                    future = concurrent.futures.Future()
+                    self._inflight[key] = future
+        
+        if pending is not None:
+            try:
+                # shield: a waiter being cancelled must not cancel the shared call
+                content, tokens = await asyncio.shield(asyncio.wrap_future(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller that owned the call was cancelled; make our own
+                return await self.complete_json(model, system_prompt, prompt, temperature)
+            self._record_llm('coalesced', tokens)
+            return json.loads(content)
+        
+        if cached is not None:
+            content, tokens = cached
+            self._record_llm('hits', tokens)
+            return json.loads(content)
+        
+        try:
+            content, tokens = await self._create_completion(model, system_prompt, prompt, temperature)
+            result = json.loads(content)  # Never cache or share a reply that doesn't parse
+        except asyncio.CancelledError:
+            self._pop_inflight(key)
+            future.cancel()
+            raise
+        except Exception as e:
+            self._pop_inflight(key)
+            future.set_exception(e)
+            raise
+        
+        # Cache before leaving the in-flight map, so no caller misses both
+        self._response_cache.set(key, (content, tokens))
+        self._pop_inflight(key)
+        future.set_result((content, tokens))
+        self._record_llm('calls', tokens)
+        return result
+    
+    def _pop_inflight(self, key: str) -> None:
+        """Remove a finished GPT call from the in-flight map"""
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+    
+    async def _create_completion(
+        self, model: str, system_prompt: str, prompt: str, temperature: float
+    ) -> Tuple[str, int]:
+        """Make one chat completion call; returns the reply text and total tokens used"""
+        async with self._semaphore:
+            response = await self._get_client().chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                response_format={"type": "json_object"}
+            )
+        
+        tokens = response.usage.total_tokens if response.usage else 0
+        return response.choices[0].message.content, tokens
+    
+    async def _extract_chunk(self, chunk_text: str, use_cache: bool = True) -> List[Dict]:
+        """Extract raw transactions from one chunk of statement text"""
+        # Create prompt for GPT-4
+        prompt = self._create_extraction_prompt(chunk_text)
+        
+        # Call GPT-4
+        result = await self.complete_json(
+            EXTRACTION_MODEL, EXTRACTION_SYSTEM_PROMPT, prompt, temperature=0.1, use_cache=use_cache
+        )
+        return result.get('transactions', [])
+    
+    def _chunk_text(self, ocr_text: str) -> List[str]:
+        """
+        Split statement text into chunks on line boundaries
+        
+        Each chunk holds at most EXTRACTION_CHUNK_CHARS characters and repeats
+        the last EXTRACTION_CHUNK_OVERLAP_LINES lines of the previous chunk, so
+        a transaction cut at a boundary appears whole in at least one chunk.
+        """
+        max_chars = settings.EXTRACTION_CHUNK_CHARS
+        overlap = settings.EXTRACTION_CHUNK_OVERLAP_LINES
+        
+        if len(ocr_text) <= max_chars:
+            return [ocr_text]
+        
+        # Hard-wrap any single line that could never fit in a chunk
+        lines = []
+        for line in ocr_text.splitlines():
+            if len(line) > max_chars:
+                lines.extend(textwrap.wrap(line, max_chars))
+            else:
+                lines.append(line)
+        
+        chunks = []
+        current = []
+        current_chars = 0
+        new_lines = 0  # Lines in the current chunk not carried over as overlap
+        
+        for line in lines:
+            if new_lines and current_chars + len(line) + 1 > max_chars:
+                chunks.append('\n'.join(current))
+                current = current[-overlap:] if overlap else []
+                current_chars = sum(len(l) + 1 for l in current)
+                new_lines = 0
+                # Drop overlap lines that would leave no room for new content
+                while current and current_chars + len(line) + 1 > max_chars:
+                    current_chars -= len(current.pop(0)) + 1
+            current.append(line)
+            current_chars += len(line) + 1
+            new_lines += 1
+        
+        if new_lines:
+            chunks.append('\n'.join(current))
+        
+        return chunks
+    
+    def _merge_chunk_transactions(self, chunk_results: List[List[Dict]]) -> List[Dict]:
+        """
+        Merge per-chunk transactions, dropping copies from overlapping lines
+        
+        A transaction seen k times in one chunk is kept k times overall, so
+        genuine repeats (two identical coffees on the same day) survive while
+        the same rows re-read in the next chunk's overlap are dropped.
+        """
+        merged = []
+        seen_counts = Counter()
+        
+        for transactions in chunk_results:
+            chunk_counts = Counter()
+            for txn in transactions:
+                key = self._transaction_key(txn)
+                chunk_counts[key] += 1
+                if chunk_counts[key] > seen_counts[key]:
+                    merged.append(txn)
+            seen_counts |= chunk_counts
+        
+        return merged
+    
+    def _transaction_key(self, txn: Dict) -> Tuple:
+        """Identity of a raw transaction for overlap deduplication"""
+        def _number(value):
+            try:
+                return round(float(value), 2)
+            except (TypeError, ValueError):
+                return value
+        
+        description = ' '.join(str(txn.get('description', '')).lower().split())
+        return (txn.get('date'), description, _number(txn.get('amount')), _number(txn.get('balance')))
     
     def _create_extraction_prompt(self, ocr_text: str) -> str:
         """Create extraction prompt for GPT-4"""
@@ -88,51 +397,37 @@ Return JSON in this exact format:
 }}
 
 Bank Statement Text:
-{ocr_text[:8000]}
+{ocr_text}
 """
     
-    def _validate_and_categorize(self, transactions: List[Dict]) -> List[Dict]:
-        """Validate and add categories to transactions"""
-        categorized = []
+    def _validate_and_categorize(
+        self,
+        transactions: List[Dict],
+        categorizer: Categorizer,
+        merchant_categories: Dict[str, str]
+    ) -> List[Dict]:
+        """Validate and add categories, with their confidence, to transactions"""
+        # Validate required fields
+        valid = [txn for txn in transactions if all(key in txn for key in ['date', 'description', 'amount'])]
         
-        for txn in transactions:
-            # Validate required fields
-            if not all(key in txn for key in ['date', 'description', 'amount']):
-                continue
-            
-            # Add category
-            category = self._categorize_transaction(txn['description'])
-            
-            categorized.append({
+        # Categories the user taught us win; keyword rules fill in the rest
+        remembered = merchant_memory.lookup_many(merchant_categories, [txn['description'] for txn in valid])
+        categories = [(category, LEARNED_CONFIDENCE) if category else None for category in remembered]
+        unknown = [i for i, category in enumerate(categories) if category is None]
+        for i, classified in zip(unknown, categorizer.classify_many(valid[i]['description'] for i in unknown)):
+            categories[i] = classified
+        
+        return [
+            {
                 'transaction_date': txn['date'],
                 'description': txn['description'],
                 'amount': float(txn['amount']),
                 'balance': float(txn.get('balance', 0)) if txn.get('balance') else None,
                 'category': category,
-                'confidence': 95  # GPT-4 is quite accurate
-            })
-        
-        return categorized
-    
-    def _categorize_transaction(self, description: str) -> str:
-        """Categorize transaction based on description"""
-        description_lower = description.lower()
-        
-        # Simple rule-based categorization (can be enhanced with ML)
-        if any(word in description_lower for word in ['amazon', 'walmart', 'target', 'store']):
-            return 'Shopping'
-        elif any(word in description_lower for word in ['restaurant', 'food', 'cafe', 'starbucks']):
-            return 'Dining'
-        elif any(word in description_lower for word in ['gas', 'fuel', 'shell', 'chevron']):
-            return 'Transportation'
-        elif any(word in description_lower for word in ['utility', 'electric', 'water', 'internet']):
-            return 'Utilities'
-        elif any(word in description_lower for word in ['payroll', 'salary', 'deposit']):
-            return 'Income'
-        elif any(word in description_lower for word in ['transfer', 'payment']):
-            return 'Transfer'
-        else:
-            return 'Uncategorized'
+                'confidence': confidence
+            }
+            for txn, (category, confidence) in zip(valid, categories)
+        ]
     
     def _detect_document_type(self, ocr_text: str) -> str:
         """Detect if document is bank statement or credit card"""
@@ -146,5 +441,7 @@ Bank Statement Text:
             return 'UNKNOWN'
 
 
-# Global instance
-extraction_service = ExtractionService()
+@functools.lru_cache(maxsize=None)
+def get_extraction_service() -> ExtractionService:
+    """Get the shared ExtractionService, creating it on first use"""
+    return ExtractionService()
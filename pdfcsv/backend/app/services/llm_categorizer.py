@@ -0,0 +1,305 @@
+"""
+LLM Transaction Categorizer
+Second pass over the transactions keyword rules could not place confidently,
+sent to the model in batches and cached by merchant across all users
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import threading
+from ..core.cache import TTLCache, get_redis_client
+from ..core.config import settings
+from .categorizer import UNCATEGORIZED
+from .extraction_service import get_extraction_service
+from .merchant_memory import merchant_key
+
+logger = logging.getLogger(__name__)
+
+CATEGORIZATION_SYSTEM_PROMPT = (
+    "You are an expert bookkeeper categorizing bank and credit card transactions. "
+    "Use only the categories you are given. Return ONLY valid JSON."
+)
+
+
+class CategoryModel(ABC):
+    """Base model interface: categorizes a batch of transaction descriptions"""
+    
+    name = "none"
+    
+    @abstractmethod
+    async def categorize_batch(
+        self, descriptions: List[str], categories: List[str], use_cache: bool = True
+    ) -> List[Optional[Tuple[str, int]]]:
+        """
+        Categorize descriptions
+        
+        use_cache=False asks for a fresh answer where the model caches replies.
+        
+        Returns:
+            (category, confidence 0-100) per description, in order; None where
+            the model gave no usable answer
+        """
+
+
+class OpenAICategoryModel(CategoryModel):
+    """Categorizes through the OpenAI chat API (shares the extraction concurrency limit)"""
+    
+    def __init__(self, model: str):
+        self.name = model
+    
+    async def categorize_batch(
+        self, descriptions: List[str], categories: List[str], use_cache: bool = True
+    ) -> List[Optional[Tuple[str, int]]]:
+        prompt = self._create_prompt(descriptions, categories)
+        result = await get_extraction_service().complete_json(
+            self.name, CATEGORIZATION_SYSTEM_PROMPT, prompt, temperature=0, use_cache=use_cache
+        )
+        
+        answers = {}
+        for item in result.get('results', []):
+            try:
+                answers[int(item['index'])] = (str(item['category']), int(item.get('confidence', 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return [answers.get(i) for i in range(len(descriptions))]
+    
+    def _create_prompt(self, descriptions: List[str], categories: List[str]) -> str:
+        """Create the categorization prompt for one batch"""
+        category_list = '\n'.join(f"- {category}" for category in categories + [UNCATEGORIZED])
+        transaction_list = '\n'.join(f"{i}. {description}" for i, description in enumerate(descriptions))
+        return f"""Categorize each of these bank transactions.
+
+Allowed categories:
+{category_list}
+
+Use "{UNCATEGORIZED}" when none fits. Give a confidence from 0 to 100.
+
+Return JSON in this exact format:
+{{
+    "results": [
+        {{"index": 0, "category": "Dining", "confidence": 90}}
+    ]
+}}
+
+Transactions:
+{transaction_list}
+"""
+
+
+class FakeCategoryModel(CategoryModel):
+    """
+    Offline stand-in for tests and local runs (CATEGORIZATION_FAKE_LLM)
+    
+    Picks a category from a hash of the description, so answers are stable
+    across runs, and records the batches it was sent so tests can check
+    batching and caching.
+    """
+    
+    name = "fake"
+    CONFIDENCE = 70
+    
+    def __init__(self):
+        self.batches = 0
+        self.descriptions = 0
+        self.sent: List[List[str]] = []
+    
+    async def categorize_batch(
+        self, descriptions: List[str], categories: List[str], use_cache: bool = True
+    ) -> List[Optional[Tuple[str, int]]]:
+        self.batches += 1
+        self.descriptions += len(descriptions)
+        self.sent.append(list(descriptions))
+        if not categories:
+            return [None for _ in descriptions]
+        
+        answers = []
+        for description in descriptions:
+            digest = hashlib.sha256(description.encode('utf-8')).digest()
+            answers.append((categories[digest[0] % len(categories)], self.CONFIDENCE))
+        return answers
+
+
+class LLMCategorizer:
+    """
+    Batched, cached LLM categorization
+    
+    Within a document, transactions below CATEGORIZATION_MIN_CONFIDENCE are
+    grouped by normalized merchant, so each merchant is asked about once,
+    and the misses go out CATEGORIZATION_BATCH_SIZE per prompt. Answers are
+    cached by (model, category set, merchant), so a merchant already seen
+    for any user with the same categories never costs a second call. The
+    in-process tier can be backed by Redis to share answers across workers.
+    """
+    
+    REDIS_PREFIX = "llmcat:"
+    
+    def __init__(self, model: CategoryModel):
+        self.model = model
+        self.local = TTLCache(settings.CATEGORIZATION_CACHE_MAX_ENTRIES, settings.CATEGORIZATION_CACHE_TTL_SECONDS)
+        self.redis = get_redis_client() if settings.CATEGORIZATION_CACHE_REDIS else None
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.recategorized = 0
+        self._stats_lock = threading.Lock()
+    
+    async def refine(self, transactions: List[Dict], categories: List[str], use_cache: bool = True) -> int:
+        """
+        Re-categorize low-confidence transactions in place
+        
+        Args:
+            transactions: Extracted transactions with category and confidence
+            categories: Categories the model may choose from (the document
+                owner's rule categories)
+            use_cache: False to ask the model about every pending merchant
+                rather than reuse cached answers (fresh ones are still stored)
+        
+        Returns:
+            number of transactions whose category or confidence improved
+        
+        Failures are logged and leave the keyword categories in place.
+        """
+        if not settings.CATEGORIZATION_LLM_ENABLED:
+            return 0
+        
+        pending: Dict[str, List[Dict]] = {}
+        scope = self._scope(categories)
+        for txn in transactions:
+            if txn['confidence'] < settings.CATEGORIZATION_MIN_CONFIDENCE:
+                pending.setdefault(self._key(scope, txn['description']), []).append(txn)
+        
+        if not pending:
+            return 0
+        
+        answers = await asyncio.to_thread(self._get_many, list(pending)) if use_cache else {}
+        missing = [key for key in pending if key not in answers]
+        cached = len(answers)
+        with self._stats_lock:
+            self.hits += cached
+            self.misses += len(missing)
+        
+        if missing:
+            batch_size = settings.CATEGORIZATION_BATCH_SIZE
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+            results = await asyncio.gather(*(
+                self._ask([pending[key][0]['description'] for key in batch], categories, use_cache)
+                for batch in batches
+            ))
+            
+            allowed = set(categories) | {UNCATEGORIZED}
+            fresh = {}
+            for batch, batch_answers in zip(batches, results):
+                for key, answer in zip(batch, batch_answers):
+                    if answer is not None and answer[0] in allowed:
+                        fresh[key] = (answer[0], max(0, min(100, answer[1])))
+            
+            if fresh:
+                await asyncio.to_thread(self._set_many, fresh)
+                answers.update(fresh)
+        
+        changed = 0
+        for key, (category, confidence) in answers.items():
+            for txn in pending[key]:
+                if confidence > txn['confidence']:
+                    txn['category'] = category
+                    txn['confidence'] = confidence
+                    changed += 1
+        
+        with self._stats_lock:
+            self.recategorized += changed
+        logger.info(
+            f"LLM categorization: {len(pending)} merchants, {cached} cached, "
+            f"{changed} transactions updated"
+        )
+        return changed
+    
+    def stats(self) -> dict:
+        """Cache and batch counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'model': self.model.name,
+            'backend': 'memory+redis' if self.redis is not None else 'memory',
+            'entries': len(self.local),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'recategorized': self.recategorized
+        }
+    
+    def _scope(self, categories: List[str]) -> str:
+        """Cache namespace for a model and category set"""
+        digest = hashlib.sha256('\n'.join(sorted(categories)).encode('utf-8')).hexdigest()[:16]
+        return f"{self.model.name}:{digest}"
+    
+    def _key(self, scope: str, description: str) -> str:
+        """Cache key for a description: its normalized merchant within scope"""
+        merchant = merchant_key(description) or ' '.join(description.lower().split())
+        return f"{scope}:{merchant}"
+    
+    async def _ask(
+        self, descriptions: List[str], categories: List[str], use_cache: bool = True
+    ) -> List[Optional[Tuple[str, int]]]:
+        """Send one batch to the model, treating a failure as no answers"""
+        with self._stats_lock:
+            self.batches += 1
+        try:
+            return await self.model.categorize_batch(descriptions, categories, use_cache)
+        except Exception as e:
+            logger.warning(f"LLM categorization batch of {len(descriptions)} failed: {e}")
+            with self._stats_lock:
+                self.failed_batches += 1
+            return [None for _ in descriptions]
+    
+    def _get_many(self, keys: List[str]) -> Dict[str, Tuple[str, int]]:
+        """Look up answers in the local tier, then Redis"""
+        answers = {}
+        remote = []
+        for key in keys:
+            answer = self.local.get(key)
+            if answer is None:
+                remote.append(key)
+            else:
+                answers[key] = answer
+        
+        if remote and self.redis is not None:
+            try:
+                payloads = self.redis.mget([self.REDIS_PREFIX + key for key in remote])
+            except Exception as e:
+                logger.warning(f"Categorization cache read failed (redis): {e}")
+                payloads = []
+            for key, payload in zip(remote, payloads):
+                if payload is not None:
+                    answer = tuple(json.loads(payload))
+                    self.local.set(key, answer)
+                    answers[key] = answer
+        
+        return answers
+    
+    def _set_many(self, answers: Dict[str, Tuple[str, int]]) -> None:
+        """Store fresh answers in both tiers"""
+        for key, answer in answers.items():
+            self.local.set(key, answer)
+        
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for key, answer in answers.items():
+                    pipe.set(self.REDIS_PREFIX + key, json.dumps(answer), ex=settings.CATEGORIZATION_CACHE_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Categorization cache write failed (redis): {e}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_categorizer() -> LLMCategorizer:
+    """Get the shared LLMCategorizer (fake model if CATEGORIZATION_FAKE_LLM), creating it on first use"""
+    if settings.CATEGORIZATION_FAKE_LLM:
+        return LLMCategorizer(FakeCategoryModel())
+    return LLMCategorizer(OpenAICategoryModel(settings.CATEGORIZATION_MODEL))
@@ -0,0 +1,154 @@
+"""
+Merchant Category Memory
+Remembers the category each user gives a merchant, so corrections carry over
+to future statements instead of being made again by hand
+"""
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.merchant_category import MerchantCategory
+
+logger = logging.getLogger(__name__)
+
+# Confidence (0-100) of a category the user chose themselves
+LEARNED_CONFIDENCE = 100
+# Merchants per upsert statement; keeps bind parameter counts under driver limits
+UPSERT_BATCH_SIZE = 5000
+
+# Card processor and bank boilerplate that says nothing about the merchant
+BOILERPLATE_PATTERN = re.compile(
+    r'\b(?:pos|debit|credit|card|checkcard|purchase|authorized on|recurring|'
+    r'preauthorized|ach|withdrawal|visa|mastercard|sq|tst|pp|paypal)\b'
+)
+# Dates such as 04/12, 04/12/24 or 2024-04-12
+DATE_PATTERN = re.compile(r'\b\d{1,4}[/-]\d{1,2}(?:[/-]\d{2,4})?\b')
+# Processor separators, as in "AMAZON.COM*2K4LM1" or "SQ *SHOP"
+SEPARATOR_PATTERN = re.compile(r'[*#]')
+# Any token with a digit: card numbers (xxxx1234), store ids (#552), references
+DIGIT_TOKEN_PATTERN = re.compile(r'\S*\d\S*')
+NON_WORD_PATTERN = re.compile(r'[^a-z&\' ]+')
+# Words that describe the kind of transaction rather than who it was with;
+# a key made only of these ("check", "atm", "online transfer") would map
+# unrelated transactions to one category
+GENERIC_TOKENS = {
+    'atm', 'check', 'cheque', 'deposit', 'transfer', 'xfer', 'payment', 'pmt', 'fee', 'charge',
+    'service', 'interest', 'cash', 'online', 'mobile', 'bill', 'pay', 'refund', 'return', 'adjustment',
+    'dividend', 'balance', 'overdraft', 'account', 'acct', 'checking', 'chk', 'savings', 'sav',
+    'to', 'from', 'for', 'the', 'of', 'and', 'in', 'at', 'ref',
+}
+# Shorter keys are too ambiguous to remember
+MIN_MERCHANT_KEY_LENGTH = 3
+US_STATE_CODES = set(
+    'al ak az ar ca co ct de fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt ne nv nh nj nm '
+    'ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy dc'.split()
+)
+
+
+def normalize_merchant(description: str) -> str:
+    """
+    Reduce a transaction description to a stable merchant key
+    
+    "POS PURCHASE 04/12 SHELL OIL 12345 HOUSTON TX" -> "shell oil houston"
+    """
+    text = description.lower()
+    text = DATE_PATTERN.sub(' ', text)
+    text = SEPARATOR_PATTERN.sub(' ', text)
+    text = DIGIT_TOKEN_PATTERN.sub(' ', text)
+    text = NON_WORD_PATTERN.sub(' ', text)
+    text = BOILERPLATE_PATTERN.sub(' ', text)
+    
+    tokens = text.split()
+    if len(tokens) > 1 and tokens[-1] in US_STATE_CODES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def merchant_key(description: str) -> Optional[str]:
+    """
+    Get the key a description is remembered under, or None if it doesn't
+    name a merchant (empty, too short, or only generic words such as
+    "CHECK 1042" -> "check")
+    """
+    merchant = normalize_merchant(description)
+    if len(merchant) < MIN_MERCHANT_KEY_LENGTH:
+        return None
+    if all(token in GENERIC_TOKENS for token in merchant.split()):
+        return None
+    return merchant
+
+
+class MerchantMemory:
+    """
+    Per-user normalized merchant -> category lookup
+    
+    Each user's whole table is loaded once and kept in an LRU of recently
+    active users. Learning invalidates the user's entry in this process;
+    other processes pick up new entries within MERCHANT_MEMORY_TTL_SECONDS.
+    """
+    
+    def __init__(self):
+        self._cache = TTLCache(settings.MERCHANT_MEMORY_MAX_USERS, settings.MERCHANT_MEMORY_TTL_SECONDS)
+    
+    def get_user_map(self, db: Session, user_id: int) -> Dict[str, str]:
+        """Get a user's merchant -> category map"""
+        merchants = self._cache.get(user_id)
+        if merchants is None:
+            rows = (
+                db.query(MerchantCategory.merchant, MerchantCategory.category)
+                .filter(MerchantCategory.user_id == user_id)
+                .all()
+            )
+            merchants = dict(rows)
+            self._cache.set(user_id, merchants)
+        return merchants
+    
+    def lookup_many(self, merchants: Dict[str, str], descriptions: Iterable[str]) -> List[Optional[str]]:
+        """Get the remembered category for each description, or None"""
+        if not merchants:
+            return [None for _ in descriptions]
+        return [merchants.get(merchant_key(description)) for description in descriptions]
+    
+    def learn(self, db: Session, user_id: int, corrections: Iterable[Tuple[str, str]]) -> int:
+        """
+        Remember (description, category) pairs the user confirmed
+        
+        Descriptions without a merchant key (see merchant_key) are skipped.
+        
+        Runs in the caller's transaction as one upsert; the caller commits.
+        
+        Returns:
+            number of merchants stored
+        """
+        rows = {}
+        for description, category in corrections:
+            merchant = merchant_key(description)
+            if merchant and category:
+                rows[merchant] = category  # Last correction for a merchant wins
+        
+        if not rows:
+            return 0
+        
+        items = list(rows.items())
+        for i in range(0, len(items), UPSERT_BATCH_SIZE):
+            statement = insert(MerchantCategory).values([
+                {'user_id': user_id, 'merchant': merchant, 'category': category}
+                for merchant, category in items[i:i + UPSERT_BATCH_SIZE]
+            ])
+            statement = statement.on_conflict_do_update(
+                constraint="uq_merchant_categories_user_id_merchant",
+                set_={'category': statement.excluded.category, 'updated_at': func.now()}
+            )
+            db.execute(statement)
+        
+        self._cache.delete(user_id)
+        logger.info(f"Learned {len(rows)} merchant categories for user {user_id}")
+        return len(rows)
+
+
+# Global instance
+merchant_memory = MerchantMemory()
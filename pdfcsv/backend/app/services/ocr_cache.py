@@ -0,0 +1,256 @@
+"""
+OCR Result Cache
+Content-addressed cache of OCR results keyed by PDF hash and OCR engine settings
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+from ..core.cache import get_redis_client
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fields of an OCR result worth keeping; success/error are implied by a hit
+CACHED_FIELDS = ('extracted_text', 'confidence', 'page_count', 'pages')
+
+
+class OCRCache:
+    """Base OCR cache with hit/miss accounting; stores nothing on its own"""
+    
+    backend = "none"
+    
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(pdf_hash: str, engine: str, engine_version: str, dpi: int) -> str:
+        """Build the cache key from the PDF's SHA-256 and everything that shapes the output"""
+        material = f"{pdf_hash}:{engine}:{engine_version}:{dpi}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return a cached OCR result, or None on a miss"""
+        try:
+            entry = self._load(key)
+        except Exception as e:
+            logger.warning(f"OCR cache read failed ({self.backend}): {e}")
+            entry = None
+        
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        if entry is None:
+            return None
+        return {**entry, 'success': True, 'error': None}
+    
+    def set(self, key: str, ocr_result: dict) -> None:
+        """Store a successful OCR result"""
+        if not ocr_result.get('success'):
+            return
+        
+        entry = {field: ocr_result.get(field) for field in CACHED_FIELDS}
+        try:
+            self._store(key, json.dumps(entry).encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"OCR cache write failed ({self.backend}): {e}")
+    
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
+    
+    def _load(self, key: str) -> Optional[dict]:
+        """Backend hook: fetch a raw entry"""
+        return None
+    
+    def _store(self, key: str, payload: bytes) -> None:
+        """Backend hook: persist a serialized entry"""
+        return None
+
+
+class DiskOCRCache(OCRCache):
+    """OCR cache stored as JSON files, evicting least recently used entries past a byte budget"""
+    
+    backend = "disk"
+    
+    def __init__(self, directory: str, max_bytes: int):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def _load(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        
+        # Bump mtime so eviction sees this entry as recently used
+        os.utime(path)
+        return entry
+    
+    def _store(self, key: str, payload: bytes) -> None:
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its budget"""
+        with self._evict_lock:
+            entries = []
+            total_bytes = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_bytes += stat.st_size
+            
+            if total_bytes <= self.max_bytes:
+                return
+            
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                if total_bytes <= self.max_bytes:
+                    break
+
+
+class RedisOCRCache(OCRCache):
+    """
+    OCR cache stored in Redis
+    
+    Entries live under ocr:entry:<key>. A sorted set scored by last access
+    time gives LRU order, a hash records each entry's size, and a counter
+    holds their total, so a write checks the byte budget in O(1) and only
+    an over-budget write reads the oldest entries.
+    """
+    
+    backend = "redis"
+    
+    PREFIX = "ocr:entry:"
+    LRU_KEY = "ocr:lru"
+    SIZES_KEY = "ocr:sizes"
+    TOTAL_KEY = "ocr:bytes"
+    # Oldest entries read per ZRANGE while evicting
+    EVICT_BATCH = 100
+    
+    def __init__(self, client, max_bytes: int):
+        super().__init__()
+        self.client = client
+        self.max_bytes = max_bytes
+        self._total_checked = False
+    
+    def _ensure_total(self) -> None:
+        """Seed the byte counter from the sizes hash if it doesn't exist yet (e.g. an older cache)"""
+        if self._total_checked:
+            return
+        if not self.client.exists(self.TOTAL_KEY):
+            total_bytes = sum(int(size) for size in self.client.hvals(self.SIZES_KEY))
+            self.client.set(self.TOTAL_KEY, total_bytes, nx=True)
+        self._total_checked = True
+    
+    def _load(self, key: str) -> Optional[dict]:
+        payload = self.client.get(self.PREFIX + key)
+        if payload is None:
+            return None
+        self.client.zadd(self.LRU_KEY, {key: time.time()})
+        return json.loads(payload)
+    
+    def _store(self, key: str, payload: bytes) -> None:
+        self._ensure_total()
+        pipe = self.client.pipeline()
+        pipe.set(self.PREFIX + key, payload)
+        pipe.zadd(self.LRU_KEY, {key: time.time()})
+        pipe.hsetnx(self.SIZES_KEY, key, len(payload))
+        _, _, added = pipe.execute()
+        
+        # Keys are content-addressed, so a rewrite has the same size; only
+        # count an entry once
+        if added:
+            total_bytes = self.client.incrby(self.TOTAL_KEY, len(payload))
+        else:
+            total_bytes = int(self.client.get(self.TOTAL_KEY) or 0)
+        
+        if total_bytes > self.max_bytes:
+            self._evict(total_bytes)
+    
+    def _evict(self, total_bytes: int) -> None:
+        """Delete least recently used entries until the cache fits its budget"""
+        while total_bytes > self.max_bytes:
+            oldest = self.client.zrange(self.LRU_KEY, 0, self.EVICT_BATCH - 1)
+            if not oldest:
+                break
+            sizes = self.client.hmget(self.SIZES_KEY, oldest)
+            
+            # Take just enough of the batch to get back under budget
+            victims = []
+            excess = total_bytes - self.max_bytes
+            for member, size in zip(oldest, sizes):
+                victims.append((member, int(size or 0)))
+                excess -= int(size or 0)
+                if excess <= 0:
+                    break
+            
+            pipe = self.client.pipeline()
+            for member, _ in victims:
+                key = member.decode('utf-8')
+                pipe.zrem(self.LRU_KEY, member)
+                pipe.delete(self.PREFIX + key)
+                pipe.hdel(self.SIZES_KEY, key)
+            results = pipe.execute()
+            
+            # Another process evicting at the same time may have removed
+            # some of these first; only subtract the sizes this one removed
+            freed = sum(size for (_, size), removed in zip(victims, results[2::3]) if removed)
+            if freed:
+                total_bytes = self.client.decrby(self.TOTAL_KEY, freed)
+            else:
+                total_bytes = int(self.client.get(self.TOTAL_KEY) or 0)
+
+
+def create_ocr_cache() -> OCRCache:
+    """Build the OCR cache configured by OCR_CACHE_BACKEND"""
+    backend = settings.OCR_CACHE_BACKEND.lower()
+    
+    if backend == "disk":
+        return DiskOCRCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_BYTES)
+    
+    if backend == "redis":
+        client = get_redis_client()
+        if client is not None:
+            return RedisOCRCache(client, settings.OCR_CACHE_MAX_BYTES)
+        logger.warning("Redis unavailable; OCR cache disabled")
+    
+    return OCRCache()
+
+
+# Global instance
+ocr_cache = create_ocr_cache()
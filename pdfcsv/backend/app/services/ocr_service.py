@@ -1,23 +1,82 @@
 """
 OCR Service with AWS Textract and Tesseract fallback
-Extracts text from PDF documents using AWS Textract (if configured) or Tesseract
+Extracts text from PDF documents, reading the embedded text layer where present
+and OCR'ing the remaining pages with AWS Textract (if configured) or Tesseract
 """
 import pytesseract
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
+import functools
 import io
 import logging
-from typing import Optional
+import multiprocessing
+import re
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Bump when the shape of extracted text changes, to invalidate cached OCR results
+OUTPUT_FORMAT_VERSION = 3
+
+# "Page    1 size: 612 x 792 pts (letter)" lines from pdfinfo -f/-l
+PAGE_SIZE_PATTERN = re.compile(r'^Page\s+(\d+) size:\s+([\d.]+) x ([\d.]+) pts', re.MULTILINE)
+
+
+def _ocr_image(image: Image.Image) -> Tuple[str, List[int]]:
+    """
+    Run Tesseract over a single page image
+    
+    Returns:
+        tuple of (page text, word confidence scores)
+    """
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    
+    # Keep Tesseract's line layout so statement rows stay one per line
+    lines = {}
+    confidence_scores = []
+    for j, text in enumerate(data['text']):
+        if text.strip():  # Only non-empty text
+            line_key = (data['block_num'][j], data['par_num'][j], data['line_num'][j])
+            lines.setdefault(line_key, []).append(text)
+            conf = int(float(data['conf'][j]))
+            if conf > 0:  # Only valid confidence scores
+                confidence_scores.append(conf)
+    
+    return '\n'.join(' '.join(words) for words in lines.values()), confidence_scores
+
+
+def _ocr_page(pdf_path: str, page_number: int, dpi: int) -> Tuple[str, List[int]]:
+    """
+    Rasterize and OCR one page of a PDF on disk
+    
+    Only this page is ever rendered, and the image is released before
+    returning. Lives at module level so it can be pickled into worker
+    processes, which then render their own page instead of receiving a
+    full-size image over IPC.
+    """
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        return _ocr_image(images[0]) if images else ('', [])
+    finally:
+        for image in images:
+            image.close()
+
 
 class OCRService:
     """Service for OCR processing using AWS Textract or Tesseract"""
     
     def __init__(self):
         """Initialize OCR service"""
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._tesseract_version: Optional[str] = None
         self.use_aws = (
             settings.AWS_ACCESS_KEY_ID != "fake-aws-key" and 
             settings.AWS_SECRET_ACCESS_KEY != "fake-aws-secret"
@@ -39,49 +98,88 @@ class OCRService:
         else:
             logger.info("Using Tesseract for OCR (AWS credentials not configured)")
     
+    def engine_version(self) -> Tuple[str, str]:
+        """
+        Identify the OCR configuration that shapes extraction output
+        
+        Used to key cached OCR results, so a Tesseract upgrade or a change in
+        text-layer settings never serves stale text.
+        """
+        if self.use_aws:
+            engine = 'textract'
+            version = 'detect_document_text'
+        else:
+            if self._tesseract_version is None:
+                self._tesseract_version = str(pytesseract.get_tesseract_version())
+            engine = 'tesseract'
+            version = self._tesseract_version
+        
+        if settings.OCR_USE_TEXT_LAYER:
+            engine += f"+text_layer:{settings.OCR_TEXT_LAYER_MIN_CHARS}:{settings.OCR_SCANNED_IMAGE_COVERAGE}"
+        
+        return engine, f"{version}/v{OUTPUT_FORMAT_VERSION}"
+    
     def extract_text_from_pdf(self, pdf_bytes: bytes) -> dict:
         """
-        Extract text from PDF using AWS Textract or Tesseract
+        Extract text from PDF, using the embedded text layer where present
+        
+        Pages that already carry native text are read directly with
+        pdftotext; only scanned or image-only pages are sent to AWS
+        Textract or Tesseract. A page counts as scanned when it has little
+        native text or is mostly covered by images, so a scan with a short
+        digital header or footer is still OCR'd.
         
         Args:
             pdf_bytes: PDF file content as bytes
             
         Returns:
-            dict with extracted_text, confidence, and page_count
+            dict with extracted_text, confidence, page_count, and per-page
+            'pages' entries recording the method used for each page
         """
-        if self.use_aws:
-            return self._extract_with_textract(pdf_bytes)
-        else:
-            return self._extract_with_tesseract(pdf_bytes)
-    
-    def _extract_with_tesseract(self, pdf_bytes: bytes) -> dict:
-        """Extract text using Tesseract OCR"""
         try:
-            # Convert PDF to images
-            logger.info("Converting PDF to images...")
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-            logger.info(f"Converted {len(images)} pages")
+            with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+                pdf_file.write(pdf_bytes)
+                pdf_file.flush()
+                
+                page_count = pdfinfo_from_path(pdf_file.name)['Pages']
+                native_pages = self._probe_text_layer(pdf_file.name, page_count)
+                scanned_pages = [n for n in range(1, page_count + 1) if native_pages[n - 1] is None]
+                logger.info(
+                    f"Text layer found on {page_count - len(scanned_pages)}/{page_count} pages, "
+                    f"{len(scanned_pages)} need OCR"
+                )
+                
+                ocr_results = {}
+                if scanned_pages:
+                    if self.use_aws:
+                        page_results = self._textract_pages(pdf_file.name, scanned_pages)
+                    else:
+                        page_results = self._ocr_pages(pdf_file.name, scanned_pages)
+                    for page_number, page_result in zip(scanned_pages, page_results):
+                        ocr_results[page_number] = page_result
             
             extracted_text = []
             confidence_scores = []
+            pages = []
             
-            for i, image in enumerate(images):
-                logger.info(f"Processing page {i+1}/{len(images)}")
-                
-                # Extract text with confidence
-                data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-                
-                # Get text and confidence
-                page_text = []
-                for j, text in enumerate(data['text']):
-                    if text.strip():  # Only non-empty text
-                        page_text.append(text)
-                        conf = int(data['conf'][j])
-                        if conf > 0:  # Only valid confidence scores
-                            confidence_scores.append(conf)
+            for page_number in range(1, page_count + 1):
+                native_text = native_pages[page_number - 1]
+                if native_text is not None:
+                    page_text = native_text
+                    method = 'text_layer'
+                    # Native text is exact; weight it like fully confident words
+                    page_scores = [100] * len(native_text.split())
+                else:
+                    page_text, page_scores, method = ocr_results[page_number]
                 
                 if page_text:
-                    extracted_text.append(' '.join(page_text))
+                    extracted_text.append(page_text)
+                confidence_scores.extend(page_scores)
+                pages.append({
+                    'page': page_number,
+                    'method': method,
+                    'confidence': int(sum(page_scores) / len(page_scores)) if page_scores else 0
+                })
             
             # Calculate average confidence
             avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 85
@@ -94,62 +192,211 @@ class OCRService:
             return {
                 'extracted_text': full_text,
                 'confidence': int(avg_confidence),
-                'page_count': len(images),
+                'page_count': page_count,
+                'pages': pages,
                 'success': True,
                 'error': None
             }
             
         except Exception as e:
-            logger.error(f"Tesseract OCR failed: {str(e)}")
+            logger.error(f"OCR failed: {str(e)}")
             return {
                 'extracted_text': '',
                 'confidence': 0,
                 'page_count': 0,
+                'pages': [],
                 'success': False,
                 'error': str(e)
             }
     
-    def _extract_with_textract(self, pdf_bytes: bytes) -> dict:
-        """Extract text using AWS Textract"""
+    def _probe_text_layer(self, pdf_path: str, page_count: int) -> List[Optional[str]]:
+        """
+        Pull the native text layer for every page with poppler's pdftotext
+        
+        Returns:
+            list indexed by page, holding the page text, or None when the page
+            has too little native text or looks scanned and must be OCR'd
+        """
+        if not settings.OCR_USE_TEXT_LAYER:
+            return [None] * page_count
+        
         try:
-            logger.info("🚀 Using AWS Textract for OCR...")
-            
-            # Call Textract
-            response = self.textract_client.detect_document_text(
-                Document={'Bytes': pdf_bytes}
+            result = subprocess.run(
+                ['pdftotext', '-layout', '-enc', 'UTF-8', pdf_path, '-'],
+                capture_output=True,
+                timeout=60,
+                check=True
             )
-            
-            # Extract text and confidence
-            extracted_text = []
-            confidence_scores = []
-            
-            for block in response['Blocks']:
-                if block['BlockType'] == 'LINE':
-                    extracted_text.append(block['Text'])
-                    if 'Confidence' in block:
-                        confidence_scores.append(block['Confidence'])
-            
-            # Calculate average confidence
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
-            
-            # Join all text
-            full_text = '\n'.join(extracted_text)
-            
-            logger.info(f"✅ AWS Textract complete. Extracted {len(full_text)} characters with {avg_confidence:.1f}% confidence")
-            
-            return {
-                'extracted_text': full_text,
-                'confidence': int(avg_confidence),
-                'page_count': 1,  # Detect document text processes one page
-                'success': True,
-                'error': None
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ AWS Textract failed: {str(e)}")
-            # Fallback to Tesseract
-            logger.info("Falling back to Tesseract...")
-            return self._extract_with_tesseract(pdf_bytes)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Text layer probe failed: {e}. Falling back to OCR for all pages.")
+            return [None] * page_count
+        
+        # pdftotext terminates every page with a form feed
+        page_texts = result.stdout.decode('utf-8', errors='replace').split('\f')
+        
+        image_coverage = self._probe_image_coverage(pdf_path, page_count)
+        
+        native_pages = []
+        for page_number in range(1, page_count + 1):
+            text = page_texts[page_number - 1].strip() if page_number <= len(page_texts) else ''
+            visible_chars = sum(1 for char in text if not char.isspace())
+            scanned = (
+                visible_chars < settings.OCR_TEXT_LAYER_MIN_CHARS
+                or image_coverage[page_number - 1] >= settings.OCR_SCANNED_IMAGE_COVERAGE
+            )
+            native_pages.append(None if scanned else text)
+        return native_pages
+    
+    def _probe_image_coverage(self, pdf_path: str, page_count: int) -> List[float]:
+        """
+        Estimate the share of each page's area covered by embedded images
+        
+        Uses poppler's pdfimages -list (image pixel size and resolution) and
+        pdfinfo (page size). A scanned page is one page-sized image, while
+        digital statements only carry small logos.
+        
+        Returns:
+            list indexed by page of coverage between 0 and 1; all zeros if
+            poppler can't tell
+        """
+        coverage = [0.0] * page_count
+        try:
+            images = subprocess.run(
+                ['pdfimages', '-list', pdf_path], capture_output=True, timeout=60, check=True
+            ).stdout.decode('utf-8', errors='replace')
+            info = subprocess.run(
+                ['pdfinfo', '-f', '1', '-l', str(page_count), pdf_path], capture_output=True, timeout=60, check=True
+            ).stdout.decode('utf-8', errors='replace')
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Image coverage probe failed: {e}. Judging pages by text only.")
+            return coverage
+        
+        # Page areas in square inches
+        page_areas = {}
+        for match in PAGE_SIZE_PATTERN.finditer(info):
+            page_areas[int(match.group(1))] = float(match.group(2)) / 72 * float(match.group(3)) / 72
+        
+        # Columns: page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+        for line in images.splitlines()[2:]:
+            fields = line.split()
+            if len(fields) < 14 or fields[2] != 'image':
+                continue
+            try:
+                page_number = int(fields[0])
+                area = int(fields[3]) / float(fields[12]) * int(fields[4]) / float(fields[13])
+            except (ValueError, ZeroDivisionError):
+                continue
+            page_area = page_areas.get(page_number)
+            if page_area and 1 <= page_number <= page_count:
+                coverage[page_number - 1] = min(1.0, coverage[page_number - 1] + area / page_area)
+        
+        return coverage
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Lazily create the page worker pool
+        
+        The pool is created from threaded processes (Celery's threads pool),
+        and forking while other threads hold locks can leave children
+        deadlocked, so workers are started by a fork server (or spawned where
+        that is unavailable) instead of forked from this process. Worker
+        threads can reach this at the same time, so creation is locked;
+        otherwise each would start its own pool and all but one would leak.
+        """
+        executor = self._executor
+        if executor is None:
+            with self._executor_lock:
+                executor = self._executor
+                if executor is None:
+                    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    executor = self._executor = ProcessPoolExecutor(
+                        max_workers=settings.OCR_WORKERS,
+                        mp_context=multiprocessing.get_context(start_method)
+                    )
+        return executor
+    
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool, unless another thread has already replaced it"""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _ocr_pages(self, pdf_path: str, page_numbers: List[int]) -> Iterator[Tuple[str, List[int], str]]:
+        """
+        Stream Tesseract results for the given pages, in page order
+        
+        At most OCR_MAX_INFLIGHT_PAGES pages are rendered or queued at any
+        time, so peak memory stays bounded regardless of page count.
+        """
+        dpi = settings.OCR_DPI
+        
+        if settings.OCR_WORKERS <= 1 or len(page_numbers) <= 1:
+            for i, page_number in enumerate(page_numbers):
+                logger.info(f"Processing page {page_number} ({i+1}/{len(page_numbers)})")
+                yield _ocr_page(pdf_path, page_number, dpi) + ('tesseract',)
+            return
+        
+        max_inflight = max(1, settings.OCR_MAX_INFLIGHT_PAGES)
+        logger.info(
+            f"Processing {len(page_numbers)} pages with {settings.OCR_WORKERS} workers "
+            f"({max_inflight} pages in flight)"
+        )
+        executor = self._get_executor()
+        remaining = deque(page_numbers)
+        pending = deque()
+        try:
+            while pending or remaining:
+                while remaining and len(pending) < max_inflight:
+                    pending.append(executor.submit(_ocr_page, pdf_path, remaining.popleft(), dpi))
+                # Pop from the left so results come back in page order
+                yield pending.popleft().result() + ('tesseract',)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); drop the pool so the next call starts fresh
+            self._discard_executor(executor)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def _textract_pages(self, pdf_path: str, page_numbers: List[int]) -> Iterator[Tuple[str, List[float], str]]:
+        """Stream AWS Textract results for the given pages, one rendered page at a time"""
+        logger.info(f"🚀 Using AWS Textract for {len(page_numbers)} pages...")
+        
+        for page_number in page_numbers:
+            try:
+                images = convert_from_path(
+                    pdf_path, dpi=settings.OCR_DPI, first_page=page_number, last_page=page_number
+                )
+                try:
+                    page_image = io.BytesIO()
+                    images[0].save(page_image, format='PNG')
+                finally:
+                    for image in images:
+                        image.close()
+                
+                # Call Textract
+                response = self.textract_client.detect_document_text(
+                    Document={'Bytes': page_image.getvalue()}
+                )
+                
+                # Extract text and confidence
+                extracted_text = []
+                confidence_scores = []
+                
+                for block in response['Blocks']:
+                    if block['BlockType'] == 'LINE':
+                        extracted_text.append(block['Text'])
+                        if 'Confidence' in block:
+                            confidence_scores.append(block['Confidence'])
+                
+                yield '\n'.join(extracted_text), confidence_scores, 'textract'
+                
+            except Exception as e:
+                logger.error(f"❌ AWS Textract failed on page {page_number}: {str(e)}")
+                # Fallback to Tesseract for this page
+                logger.info("Falling back to Tesseract...")
+                yield _ocr_page(pdf_path, page_number, settings.OCR_DPI) + ('tesseract',)
     
     def extract_text_multipage(self, pdf_bytes: bytes) -> dict:
         """
@@ -158,5 +405,7 @@ class OCRService:
         return self.extract_text_from_pdf(pdf_bytes)
 
 
-# Global instance
-ocr_service = OCRService()
+@functools.lru_cache(maxsize=None)
+def get_ocr_service() -> OCRService:
+    """Get the shared OCRService, creating it (and any Textract client) on first use"""
+    return OCRService()
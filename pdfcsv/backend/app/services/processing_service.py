@@ -2,118 +2,303 @@
 Document Processing Pipeline
 Orchestrates OCR and extraction services
 """
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.sql import func
+from typing import Dict, Optional, Tuple
 from ..models.document import Document, DocumentStatus, DocumentType
 from ..models.transaction import Transaction
-from .ocr_service import ocr_service
-from .extraction_service import extraction_service
+from ..models.user import User
+from ..core.config import settings
+from .ocr_cache import ocr_cache
+from .extraction_service import get_extraction_service
+from .categorizer import get_categorizer
+from .llm_categorizer import get_llm_categorizer
+from .merchant_memory import merchant_memory
+from .storage_service import get_storage
+import asyncio
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Pipeline stages in execution order
+STAGE_OCR = "ocr"
+STAGE_EXTRACTION = "extraction"
+STAGE_SAVE = "save"
+STAGES = (STAGE_OCR, STAGE_EXTRACTION, STAGE_SAVE)
+
+
 class ProcessingService:
-    """Main service for processing documents"""
+    """
+    Main service for processing documents
+    
+    The pipeline is a sequence of checkpointed stages (OCR, extraction,
+    save). Each stage persists its output on the document, and a stage whose
+    output is already stored is skipped, so a retry or reprocess resumes
+    from the first incomplete stage instead of re-running OCR.
+    
+    The pipeline runs on the event loop but never blocks it: OCR and every
+    database call are pushed to worker threads, and GPT calls are awaited.
+    """
     
-    async def process_document(self, document_id: int, pdf_bytes: bytes, db: Session) -> dict:
+    def is_stage_complete(self, document: Document, stage: str) -> bool:
+        """Check whether a stage's output is already stored on the document"""
+        if stage == STAGE_OCR:
+            return document.ocr_text is not None
+        if stage == STAGE_EXTRACTION:
+            return document.extraction_data is not None
+        if stage == STAGE_SAVE:
+            return document.status in (DocumentStatus.READY, DocumentStatus.SYNCED)
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+    
+    def first_incomplete_stage(self, document: Document) -> Optional[str]:
+        """Get the stage processing would resume from, or None if the document is done"""
+        for stage in STAGES:
+            if not self.is_stage_complete(document, stage):
+                return stage
+        return None
+    
+    async def process_document(self, document_id: int, db: Session, use_cache: bool = True) -> dict:
         """
         Process a document through OCR and extraction pipeline
         
         Args:
             document_id: Document ID in database
-            pdf_bytes: PDF file content
-            db: Database session
-            
+            db: Database session owned by the caller (not request-scoped)
+            use_cache: False to skip reading the OCR, GPT response and
+                categorization caches, for a fresh run
+        
         Returns:
-            dict with processing results
+            dict with processing results; failures carry 'retryable' to tell
+            the task queue whether another attempt could succeed. A retryable
+            failure leaves the document in PROCESSING, for the caller to
+            retry or mark_failed.
         """
         try:
-            # Get document
-            document = db.query(Document).filter(Document.id == document_id).first()
+            # Get document and update status to PROCESSING
+            document, resume_stage = await asyncio.to_thread(self._start_processing, db, document_id)
             if not document:
-                return {'success': False, 'error': 'Document not found'}
+                return {'success': False, 'error': 'Document not found', 'retryable': False}
             
-            # Update status to PROCESSING
-            document.status = DocumentStatus.PROCESSING
-            db.commit()
+            if resume_stage is None:
+                logger.info(f"Document {document_id} already processed; nothing to do")
+                return {'success': True, 'document_id': document_id, 'stages_run': []}
             
-            # Step 1: OCR Extraction
-            logger.info(f"Starting OCR for document {document_id}")
-            ocr_result = ocr_service.extract_text_from_pdf(pdf_bytes)
+            logger.info(f"Processing document {document_id} from stage '{resume_stage}'")
+            stages_run = []
             
-            if not ocr_result['success']:
-                document.status = DocumentStatus.ERROR
-                document.error_message = f"OCR failed: {ocr_result['error']}"
-                db.commit()
-                return {'success': False, 'error': ocr_result['error']}
-            
-            # Update document with OCR results
-            document.ocr_text = ocr_result['extracted_text']
-            document.ocr_confidence = ocr_result['confidence']
-            document.page_count = ocr_result['page_count']
-            document.status = DocumentStatus.OCR_COMPLETE
-            db.commit()
+            # Step 1: OCR Extraction
+            if not self.is_stage_complete(document, STAGE_OCR):
+                # Read the PDF from storage
+                try:
+                    pdf_bytes = await asyncio.to_thread(self._read_file, document.file_path)
+                except FileNotFoundError:
+                    await asyncio.to_thread(self._mark_error, db, document, "Uploaded file not found")
+                    return {'success': False, 'error': 'Uploaded file not found', 'retryable': False}
+                
+                ocr_result = await asyncio.to_thread(self._run_ocr, document, pdf_bytes, use_cache)
+                
+                if not ocr_result['success']:
+                    await asyncio.to_thread(self._record_failure, db, document, f"OCR failed: {ocr_result['error']}")
+                    return {'success': False, 'error': ocr_result['error'], 'retryable': True}
+                
+                # Update document with OCR results
+                await asyncio.to_thread(self._save_ocr_result, db, document, ocr_result)
+                stages_run.append(STAGE_OCR)
             
             # Step 2: Transaction Extraction with GPT-4
-            logger.info(f"Starting extraction for document {document_id}")
-            extraction_result = extraction_service.extract_transactions(ocr_result['extracted_text'])
-            
-            if not extraction_result['success']:
-                document.status = DocumentStatus.ERROR
-                document.error_message = f"Extraction failed: {extraction_result['error']}"
-                db.commit()
-                return {'success': False, 'error': extraction_result['error']}
-            
-            # Set document type
-            if extraction_result['document_type'] == 'CREDIT_CARD':
-                document.document_type = DocumentType.CREDIT_CARD
-            elif extraction_result['document_type'] == 'BANK_STATEMENT':
-                document.document_type = DocumentType.BANK_STATEMENT
-            else:
-                document.document_type = DocumentType.UNKNOWN
-            
-            # Step 3: Save transactions
-            logger.info(f"Saving {len(extraction_result['transactions'])} transactions for document {document_id}")
-            transaction_count = 0
-            
-            for txn_data in extraction_result['transactions']:
-                transaction = Transaction(
-                    document_id=document.id,
-                    transaction_date=txn_data['transaction_date'],
-                    description=txn_data['description'],
-                    amount=txn_data['amount'],
-                    balance=txn_data.get('balance'),
-                    category=txn_data['category']
+            if not self.is_stage_complete(document, STAGE_EXTRACTION):
+                logger.info(f"Starting extraction for document {document_id}")
+                user_rules, merchant_categories = await asyncio.to_thread(
+                    self._load_user_categorization, db, document.user_id
+                )
+                categorizer = get_categorizer(user_rules)
+                extraction_result = await get_extraction_service().extract_transactions(
+                    document.ocr_text, categorizer, merchant_categories, use_cache=use_cache
+                )
+                
+                if not extraction_result['success']:
+                    await asyncio.to_thread(
+                        self._record_failure, db, document, f"Extraction failed: {extraction_result['error']}"
+                    )
+                    return {'success': False, 'error': extraction_result['error'], 'retryable': True}
+                
+                # Second opinion from the model on rows the rules were unsure about
+                await get_llm_categorizer().refine(
+                    extraction_result['transactions'], categorizer.categories, use_cache=use_cache
                 )
-                db.add(transaction)
-                transaction_count += 1
+                
+                await asyncio.to_thread(self._save_extraction_result, db, document, extraction_result)
+                stages_run.append(STAGE_EXTRACTION)
             
-            # Update document status
-            document.status = DocumentStatus.READY
-            db.commit()
+            # Step 3: Save transactions
+            extraction_data = json.loads(document.extraction_data)
+            transaction_count = await asyncio.to_thread(self._save_transactions, db, document, extraction_data)
+            stages_run.append(STAGE_SAVE)
             
             logger.info(f"Document {document_id} processed successfully. {transaction_count} transactions extracted.")
             
             return {
                 'success': True,
                 'document_id': document_id,
+                'stages_run': stages_run,
                 'transaction_count': transaction_count,
-                'ocr_confidence': ocr_result['confidence'],
-                'document_type': extraction_result['document_type']
+                'ocr_confidence': document.ocr_confidence,
+                'document_type': extraction_data['document_type'],
+                'extraction_method': extraction_data.get('extraction_method')
             }
-            
+        
         except Exception as e:
             logger.error(f"Error processing document {document_id}: {str(e)}")
             
-            # Update document status to error
-            document = db.query(Document).filter(Document.id == document_id).first()
-            if document:
-                document.status = DocumentStatus.ERROR
-                document.error_message = str(e)
-                db.commit()
+            # Left in PROCESSING: the task queue retries it, and only marks it
+            # ERROR once retries run out (see mark_failed)
+            await asyncio.to_thread(self._record_failure_by_id, db, document_id, str(e))
             
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e), 'retryable': True}
+    
+    def _start_processing(self, db: Session, document_id: int) -> Tuple[Optional[Document], Optional[str]]:
+        """Load the document and, if any stage is left, mark it as processing"""
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if not document:
+            return None, None
+        
+        resume_stage = self.first_incomplete_stage(document)
+        if resume_stage is not None:
+            document.status = DocumentStatus.PROCESSING
+            document.error_message = None
+            db.commit()
+        return document, resume_stage
+    
+    def _load_user_categorization(self, db: Session, user_id: int) -> Tuple[Optional[str], Dict[str, str]]:
+        """Get the document owner's category rules (JSON) and learned merchant categories"""
+        user_rules = db.query(User.category_rules).filter(User.id == user_id).scalar()
+        return user_rules, merchant_memory.get_user_map(db, user_id)
+    
+    def _read_file(self, file_path: str) -> bytes:
+        """Read an uploaded PDF from storage"""
+        return get_storage().read(file_path)
+    
+    def _run_ocr(self, document: Document, pdf_bytes: bytes, use_cache: bool = True) -> dict:
+        """Run OCR, reusing cached results for identical PDFs unless use_cache is False"""
+        # Imported on first use: OCR pulls in PIL, pytesseract and pdf2image,
+        # which processes that never run the pipeline shouldn't pay for
+        from .ocr_service import get_ocr_service
+        
+        ocr_service = get_ocr_service()
+        document_id = document.id
+        cache_key = ocr_cache.make_key(
+            document.content_hash or hashlib.sha256(pdf_bytes).hexdigest(),
+            *ocr_service.engine_version(),
+            settings.OCR_DPI
+        )
+        ocr_result = ocr_cache.get(cache_key) if use_cache else None
+        
+        if ocr_result is not None:
+            logger.info(f"OCR cache hit for document {document_id}")
+            return ocr_result
+        
+        logger.info(f"Starting OCR for document {document_id}")
+        ocr_result = ocr_service.extract_text_from_pdf(pdf_bytes)
+        ocr_cache.set(cache_key, ocr_result)
+        return ocr_result
+    
+    def _save_ocr_result(self, db: Session, document: Document, ocr_result: dict) -> None:
+        """Store OCR output on the document"""
+        document.ocr_text = ocr_result['extracted_text']
+        document.ocr_confidence = ocr_result['confidence']
+        document.page_count = ocr_result['page_count']
+        document.ocr_pages = json.dumps(ocr_result.get('pages') or [])
+        document.status = DocumentStatus.OCR_COMPLETE
+        db.commit()
+    
+    def _save_extraction_result(self, db: Session, document: Document, extraction_result: dict) -> None:
+        """Checkpoint extracted transactions on the document"""
+        document.extraction_data = json.dumps({
+            'transactions': extraction_result['transactions'],
+            'document_type': extraction_result['document_type'],
+            'extraction_method': extraction_result['extraction_method']
+        })
+        document.status = DocumentStatus.EXTRACTION_COMPLETE
+        db.commit()
+    
+    def _save_transactions(self, db: Session, document: Document, extraction_data: dict) -> int:
+        """Store extracted transactions and mark the document ready"""
+        # Set document type
+        if extraction_data['document_type'] == 'CREDIT_CARD':
+            document.document_type = DocumentType.CREDIT_CARD
+        elif extraction_data['document_type'] == 'BANK_STATEMENT':
+            document.document_type = DocumentType.BANK_STATEMENT
+        else:
+            document.document_type = DocumentType.UNKNOWN
+        
+        # Clear rows from an earlier interrupted attempt so the stage is idempotent
+        db.query(Transaction).filter(Transaction.document_id == document.id).delete(synchronize_session=False)
+        
+        logger.info(f"Saving {len(extraction_data['transactions'])} transactions for document {document.id}")
+        rows = [
+            {
+                'document_id': document.id,
+                'user_id': document.user_id,
+                'transaction_date': txn_data['transaction_date'],
+                'description': txn_data['description'],
+                'amount': txn_data['amount'],
+                'balance': txn_data.get('balance'),
+                'category': txn_data['category'],
+                'category_confidence': txn_data.get('confidence')
+            }
+            for txn_data in extraction_data['transactions']
+        ]
+        
+        # One executemany through Core instead of an ORM object per row;
+        # SQLAlchemy batches it into multi-row INSERT ... VALUES statements
+        if rows:
+            db.execute(insert(Transaction), rows)
+        transaction_count = len(rows)
+        
+        # Update document status
+        document.status = DocumentStatus.READY
+        document.processed_at = func.now()
+        db.commit()
+        
+        return transaction_count
+    
+    def _mark_error(self, db: Session, document: Document, error_message: str) -> None:
+        """Mark the document as failed"""
+        document.status = DocumentStatus.ERROR
+        document.error_message = error_message
+        db.commit()
+    
+    def _record_failure(self, db: Session, document: Document, error_message: str) -> None:
+        """
+        Note a retryable failure without leaving PROCESSING
+        
+        The document stays claimed while a retry is pending, so reprocess
+        can't queue a second pipeline alongside the retry.
+        """
+        document.error_message = error_message
+        db.commit()
+    
+    def _record_failure_by_id(self, db: Session, document_id: int, error_message: str) -> None:
+        """Note a retryable failure after an unexpected error"""
+        db.rollback()
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document:
+            self._record_failure(db, document, error_message)
+    
+    def mark_failed(self, db: Session, document_id: int, error_message: str) -> None:
+        """
+        Mark a document as failed once no retry is left
+        
+        Keeps the message recorded by the last attempt, if any.
+        """
+        db.rollback()
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document and document.status == DocumentStatus.PROCESSING:
+            self._mark_error(db, document, document.error_message or error_message)
 
 
 # Global instance
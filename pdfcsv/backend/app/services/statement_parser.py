@@ -0,0 +1,359 @@
+"""
+Rule-based Statement Parser
+Parses regular "date  description  amount  balance" statement layouts locally,
+so only irregular statements need a GPT round trip
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import re
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MONEY_PATTERN = re.compile(
+    r'^(?P<open>-|\()?\$?(?P<number>\d{1,3}(?:,\d{3})+|\d+)\.(?P<cents>\d{2})\)?(?P<suffix>-|CR|DR)?$',
+    re.IGNORECASE
+)
+PLACEHOLDERS = {'-', '--', '—', '–'}
+YEAR_PATTERN = re.compile(r'\b(19\d{2}|20\d{2})\b')
+SUMMARY_ROW_PATTERN = re.compile(r'\b(beginning|opening|starting|ending|closing)\s+balance\b', re.IGNORECASE)
+OPENING_BALANCE_PATTERN = re.compile(r'\b(beginning|opening|starting|previous)\s+balance\b', re.IGNORECASE)
+
+# Layouts without a year are parsed in a leap year, so 02/29 is accepted
+PLACEHOLDER_YEAR = 2000
+# A month drop this large between consecutive rows means the year rolled over
+# (12/30 -> 01/02); smaller drops are rows printed slightly out of order
+YEAR_ROLLOVER_MONTHS = 6
+
+# Balances are printed to the cent, so anything beyond rounding noise is a mismatch
+RECONCILE_TOLERANCE = Decimal('0.01')
+
+# Share of rows that must reconcile when there are no balances to check against
+UNVERIFIED_CONSISTENCY = 0.7
+
+
+class LayoutTemplate:
+    """
+    A bank statement line layout
+    
+    Rows start with a date in one of date_formats and end with the trailing
+    money columns named in columns: ('amount', 'balance') for signed amounts,
+    or ('debit', 'credit', 'balance') for split columns. markers restricts
+    the template to statements containing one of the given phrases.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        date_pattern: str,
+        date_formats: Sequence[str],
+        columns: Sequence[str],
+        markers: Sequence[str] = ()
+    ):
+        self.name = name
+        self.row_pattern = re.compile(rf'^\s*(?P<date>{date_pattern})\s+(?P<rest>.+?)\s*$')
+        self.date_formats = list(date_formats)
+        self.columns = tuple(columns)
+        self.markers = [marker.lower() for marker in markers]
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "LayoutTemplate":
+        """Build a template from config (see RULE_PARSER_TEMPLATES_PATH)"""
+        return cls(
+            name=data['name'],
+            date_pattern=data['date_pattern'],
+            date_formats=data['date_formats'],
+            columns=data['columns'],
+            markers=data.get('markers', ())
+        )
+    
+    def applies_to(self, text_lower: str) -> bool:
+        """Check whether this template should be tried on a statement"""
+        return not self.markers or any(marker in text_lower for marker in self.markers)
+    
+    def parse_date(self, value: str) -> Optional[Tuple[datetime, bool]]:
+        """
+        Parse a row date
+        
+        Returns:
+            (date, has_year), or None if no format matches; dates from formats
+            without a year come back in PLACEHOLDER_YEAR and need the year
+            filled in from the statement (see _infer_years)
+        """
+        for date_format in self.date_formats:
+            has_year = '%y' in date_format.lower()
+            try:
+                if has_year:
+                    parsed = datetime.strptime(value, date_format)
+                else:
+                    parsed = datetime.strptime(f"{value} {PLACEHOLDER_YEAR}", f"{date_format} %Y")
+            except ValueError:
+                continue
+            return parsed, has_year
+        return None
+
+
+DEFAULT_TEMPLATES = [
+    LayoutTemplate(
+        'us_signed_amount',
+        r'\d{1,2}/\d{1,2}/\d{2,4}',
+        ['%m/%d/%Y', '%m/%d/%y'],
+        ('amount', 'balance')
+    ),
+    LayoutTemplate(
+        'us_debit_credit',
+        r'\d{1,2}/\d{1,2}/\d{2,4}',
+        ['%m/%d/%Y', '%m/%d/%y'],
+        ('debit', 'credit', 'balance')
+    ),
+    LayoutTemplate(
+        'us_short_date',
+        r'\d{1,2}/\d{1,2}',
+        ['%m/%d'],
+        ('amount', 'balance')
+    ),
+    LayoutTemplate(
+        'iso_signed_amount',
+        r'\d{4}-\d{2}-\d{2}',
+        ['%Y-%m-%d'],
+        ('amount', 'balance')
+    ),
+]
+
+
+def _parse_money(token: str) -> Optional[Decimal]:
+    """Parse a money token such as $1,234.56, (45.67), 45.67- or 45.67CR"""
+    match = MONEY_PATTERN.match(token)
+    if not match:
+        return None
+    try:
+        value = Decimal(f"{match.group('number').replace(',', '')}.{match.group('cents')}")
+    except InvalidOperation:
+        return None
+    suffix = (match.group('suffix') or '').upper()
+    if match.group('open') or suffix in ('-', 'DR'):
+        value = -value
+    return value
+
+
+def _infer_years(dates: List[Tuple[datetime, bool]], statement_years: List[int]) -> List[Optional[str]]:
+    """
+    Fill in the year for rows whose layout omits it
+    
+    Rows are in statement order, so each big drop in month (12/30 -> 01/02)
+    is a year rollover. The last row falls in the latest year printed on the
+    statement, and earlier rows are counted back from it, so a
+    "Dec 2023 - Jan 2024" statement puts 12/30 in 2023 and 01/02 in 2024.
+    
+    Returns:
+        YYYY-MM-DD per row; None for yearless rows when the statement
+        mentions no year
+    """
+    rollovers = []
+    total = 0
+    previous_month = None
+    for parsed, has_year in dates:
+        if not has_year:
+            if previous_month is not None and previous_month - parsed.month >= YEAR_ROLLOVER_MONTHS:
+                total += 1
+            previous_month = parsed.month
+        rollovers.append(total)
+    
+    first_year = max(statement_years) - total if statement_years else None
+    
+    result = []
+    for (parsed, has_year), rollover in zip(dates, rollovers):
+        if has_year:
+            result.append(parsed.strftime('%Y-%m-%d'))
+        elif first_year is None:
+            result.append(None)
+        else:
+            try:
+                result.append(parsed.replace(year=first_year + rollover).strftime('%Y-%m-%d'))
+            except ValueError:
+                result.append(None)  # 02/29 in a non-leap year
+    return result
+
+
+def _find_opening_balance(lines: List[str]) -> Optional[Decimal]:
+    """Opening balance printed on an undated summary line, if any"""
+    for line in lines:
+        if OPENING_BALANCE_PATTERN.search(line):
+            _, values = _split_trailing_columns(line, 1)
+            if values and values[0] is not None:
+                return values[0]
+    return None
+
+
+def _split_trailing_columns(rest: str, max_columns: int) -> Tuple[str, List[Optional[Decimal]]]:
+    """Peel up to max_columns money/placeholder tokens off the end of a row"""
+    tokens = rest.split()
+    values = []
+    while tokens and len(values) < max_columns:
+        token = tokens[-1]
+        if token in PLACEHOLDERS:
+            values.append(None)
+        else:
+            value = _parse_money(token)
+            if value is None:
+                break
+            values.append(value)
+        tokens.pop()
+    values.reverse()
+    return ' '.join(tokens), values
+
+
+class StatementParser:
+    """Deterministic parser for statements with a regular columnar layout"""
+    
+    def __init__(self):
+        """Load built-in templates plus any configured per-bank templates"""
+        self.templates: List[LayoutTemplate] = list(DEFAULT_TEMPLATES)
+        
+        if settings.RULE_PARSER_TEMPLATES_PATH:
+            try:
+                with open(settings.RULE_PARSER_TEMPLATES_PATH) as f:
+                    for data in json.load(f):
+                        self.register_template(LayoutTemplate.from_dict(data))
+            except Exception as e:
+                logger.warning(f"Failed to load statement templates: {e}")
+    
+    def register_template(self, template: LayoutTemplate) -> None:
+        """Add a layout template; custom templates are tried before the built-ins"""
+        self.templates.insert(0, template)
+    
+    def parse(self, text: str) -> dict:
+        """
+        Parse statement text with every applicable template
+        
+        Returns:
+            dict with transactions (in the same raw shape GPT returns),
+            confidence (0-100) and the winning template name
+        """
+        lines = text.splitlines()
+        text_lower = text.lower()
+        statement_years = [int(year) for year in YEAR_PATTERN.findall(text)]
+        opening_balance = _find_opening_balance(lines)
+        
+        best = {'transactions': [], 'confidence': 0, 'template': None}
+        for template in self.templates:
+            if not template.applies_to(text_lower):
+                continue
+            transactions, confidence = self._parse_with(template, lines, statement_years, opening_balance)
+            if confidence > best['confidence']:
+                best = {'transactions': transactions, 'confidence': confidence, 'template': template.name}
+        
+        return best
+    
+    def _parse_with(
+        self,
+        template: LayoutTemplate,
+        lines: List[str],
+        statement_years: List[int],
+        opening_balance: Optional[Decimal]
+    ) -> Tuple[List[Dict], int]:
+        """
+        Parse lines with one template and score the result
+        
+        Confidence combines coverage (dated lines that parsed as rows) with
+        consistency (rows whose amount moves the previous running balance to
+        the printed balance). Every row counts toward consistency, so a first
+        row with no opening balance to check it against lowers confidence.
+        """
+        rows = []
+        for line in lines:
+            match = template.row_pattern.match(line)
+            if not match:
+                continue
+            parsed = template.parse_date(match.group('date'))
+            if parsed is not None:
+                rows.append((match, parsed))
+        
+        transactions = []
+        candidates = 0
+        checked = 0
+        reconciled = 0
+        running_balance = opening_balance
+        
+        row_dates = _infer_years([parsed for _, parsed in rows], statement_years)
+        for (match, _), txn_date in zip(rows, row_dates):
+            if txn_date is None:
+                continue
+            
+            description, values = _split_trailing_columns(match.group('rest'), len(template.columns))
+            
+            # Opening/closing balance rows anchor the running balance
+            if SUMMARY_ROW_PATTERN.search(description):
+                if values and values[-1] is not None:
+                    running_balance = values[-1]
+                continue
+            
+            candidates += 1
+            if not any(char.isalpha() for char in description):
+                continue
+            
+            amount, balance = self._assign_columns(template, values, running_balance)
+            if amount is None:
+                continue
+            
+            if running_balance is not None and balance is not None:
+                checked += 1
+                if abs(running_balance + amount - balance) <= RECONCILE_TOLERANCE:
+                    reconciled += 1
+            if balance is not None:
+                running_balance = balance
+            
+            transactions.append({
+                'date': txn_date,
+                'description': description,
+                'amount': float(amount),
+                'balance': float(balance) if balance is not None else None
+            })
+        
+        if not transactions:
+            return [], 0
+        
+        coverage = len(transactions) / candidates
+        if checked:
+            consistency = reconciled / len(transactions)
+        else:
+            consistency = UNVERIFIED_CONSISTENCY
+        return transactions, int(100 * coverage * consistency)
+    
+    def _assign_columns(
+        self,
+        template: LayoutTemplate,
+        values: List[Optional[Decimal]],
+        running_balance: Optional[Decimal]
+    ) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """Map trailing column values to a signed (amount, balance) pair"""
+        if template.columns == ('amount', 'balance'):
+            if len(values) == 2:
+                return values[0], values[1]
+            if len(values) == 1:
+                return values[0], None
+            return None, None
+        
+        if template.columns == ('debit', 'credit', 'balance'):
+            if len(values) == 3:
+                debit, credit, balance = values
+                if debit is None and credit is None:
+                    return None, None
+                return (credit or Decimal('0')) - abs(debit or Decimal('0')), balance
+            if len(values) == 2 and values[0] is not None and values[1] is not None:
+                # One blank column collapsed away (common in text layers):
+                # let the running balance tell a debit from a credit
+                amount, balance = abs(values[0]), values[1]
+                if running_balance is not None and abs(running_balance + amount - balance) <= RECONCILE_TOLERANCE:
+                    return amount, balance
+                return -amount, balance
+            return None, None
+        
+        return None, None
+
+
+# Global instance
+statement_parser = StatementParser()
@@ -0,0 +1,234 @@
+"""
+File Storage Service
+Stores uploaded documents on local disk or in an S3-compatible bucket (S3, R2, MinIO)
+"""
+from abc import ABC, abstractmethod
+import functools
+import logging
+import os
+from typing import Iterable, Optional
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+
+
+class StorageWriter(ABC):
+    """Streaming writer for one object; nothing is visible until commit()"""
+    
+    @abstractmethod
+    def write(self, chunk: bytes) -> None:
+        """Append a chunk"""
+    
+    @abstractmethod
+    def commit(self) -> None:
+        """Finish the upload and publish the object"""
+    
+    @abstractmethod
+    def abort(self) -> None:
+        """Discard everything written so far"""
+
+
+class StorageBackend(ABC):
+    """Interface shared by the storage backends"""
+    
+    name = "base"
+    
+    @abstractmethod
+    def open_writer(self, key: str) -> StorageWriter:
+        """Start a streaming upload to key"""
+    
+    @abstractmethod
+    def read(self, key: str, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        """
+        Read an object, or the inclusive byte range [start, end] of it
+        
+        Raises:
+            FileNotFoundError: if the object does not exist
+        """
+    
+    def delete(self, key: str) -> None:
+        """Delete an object; missing objects are ignored"""
+        self.delete_many([key])
+    
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """Delete several objects; missing objects are ignored"""
+
+
+class _LocalWriter(StorageWriter):
+    """Writes to a .part file and renames it into place on commit"""
+    
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.partial_path = f"{path}.part"
+        self._file = open(self.partial_path, "wb")
+    
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+    
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+    
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+class LocalStorage(StorageBackend):
+    """Storage on the local filesystem, keys are paths relative to root"""
+    
+    name = "local"
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+    
+    def open_writer(self, key: str) -> StorageWriter:
+        return _LocalWriter(self._path(key))
+    
+    def read(self, key: str, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        with open(self._path(key), "rb") as f:
+            if start is None:
+                return f.read()
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+class _S3MultipartWriter(StorageWriter):
+    """
+    Streams an object to S3 as a multipart upload
+    
+    Chunks are buffered up to part_size (S3 requires at least 5MB for every
+    part but the last). Objects smaller than one part are sent with a single
+    PutObject instead.
+    """
+    
+    def __init__(self, client, bucket: str, key: str, part_size: int):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+    
+    def write(self, chunk: bytes) -> None:
+        self._buffer.extend(chunk)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+    
+    def _upload_part(self, data: bytes) -> None:
+        if self._upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self._upload_id = response['UploadId']
+        
+        part_number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+    
+    def commit(self) -> None:
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            return
+        
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={'Parts': self._parts}
+        )
+    
+    def abort(self) -> None:
+        self._buffer.clear()
+        if self._upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+
+class S3Storage(StorageBackend):
+    """Storage in an S3-compatible bucket; S3_ENDPOINT_URL selects R2, MinIO or moto"""
+    
+    name = "s3"
+    
+    def __init__(self, bucket: str, part_size: int):
+        import boto3
+        
+        self.bucket = bucket
+        self.part_size = part_size
+        self.client = boto3.client(
+            's3',
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION
+        )
+    
+    def open_writer(self, key: str) -> StorageWriter:
+        return _S3MultipartWriter(self.client, self.bucket, key, self.part_size)
+    
+    def read(self, key: str, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        from botocore.exceptions import ClientError
+        
+        kwargs = {'Bucket': self.bucket, 'Key': key}
+        if start is not None:
+            kwargs['Range'] = f"bytes={start}-{'' if end is None else end}"
+        
+        try:
+            response = self.client.get_object(**kwargs)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                raise FileNotFoundError(key) from e
+            raise
+        return response['Body'].read()
+    
+    def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[i:i + S3_DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                logger.warning(f"Failed to delete {error.get('Key')} from storage: {error.get('Message')}")
+
+
+def create_storage() -> StorageBackend:
+    """Build the storage backend configured by STORAGE_BACKEND"""
+    backend = settings.STORAGE_BACKEND.lower()
+    
+    if backend == "s3":
+        logger.info(f"Using S3 storage (bucket {settings.S3_BUCKET_NAME})")
+        return S3Storage(settings.S3_BUCKET_NAME, settings.S3_MULTIPART_PART_SIZE_MB * 1024 * 1024)
+    
+    return LocalStorage(settings.LOCAL_STORAGE_ROOT)
+
+
+@functools.lru_cache(maxsize=None)
+def get_storage() -> StorageBackend:
+    """Get the shared storage backend, creating it (and any S3 client) on first use"""
+    return create_storage()
@@ -0,0 +1,180 @@
+"""
+Authenticated User Cache
+Short-TTL cache of user rows so get_current_user does not hit Postgres on
+every request, with an optional Redis tier shared across processes
+"""
+from sqlalchemy import DateTime, Enum, event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from datetime import datetime
+from typing import Optional
+import json
+import logging
+import threading
+from ..core.cache import TTLCache, get_redis_client
+from ..core.config import settings
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Secrets that are never needed for auth; left unloaded and fetched on access
+UNCACHED_COLUMNS = {'hashed_password', 'quickbooks_refresh_token'}
+
+CACHED_COLUMNS = [column for column in User.__table__.columns if column.key not in UNCACHED_COLUMNS]
+
+
+def _to_json(snapshot: dict) -> str:
+    """Serialize a snapshot for Redis"""
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in snapshot.items()
+    })
+
+
+def _from_json(payload: bytes) -> dict:
+    """Restore a snapshot from Redis, converting values back to column types"""
+    data = json.loads(payload)
+    for column in CACHED_COLUMNS:
+        value = data.get(column.key)
+        if value is None:
+            continue
+        if isinstance(column.type, DateTime):
+            data[column.key] = datetime.fromisoformat(value)
+        elif isinstance(column.type, Enum) and column.type.enum_class is not None:
+            data[column.key] = column.type.enum_class(value)
+    return data
+
+
+class UserCache:
+    """
+    Two-tier cache of user rows keyed by user id
+    
+    Entries are column snapshots rather than ORM objects, so a cached user is
+    re-attached to the request's session without a SELECT and can still be
+    modified and flushed as usual. Any ORM update or delete of a user
+    invalidates both tiers once its transaction commits (see the events
+    below). Other processes'
+    in-process tiers expire within USER_CACHE_TTL_SECONDS.
+    """
+    
+    REDIS_PREFIX = "user:"
+    
+    def __init__(self):
+        self.local = TTLCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+        self.redis = get_redis_client() if settings.USER_CACHE_REDIS else None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+    
+    def load(self, db: Session, user_id: int) -> Optional[User]:
+        """
+        Get a user attached to db, from cache when possible
+        
+        Returns:
+            the User, or None if no such user exists
+        """
+        snapshot = self._get(user_id)
+        if snapshot is not None:
+            user = User(**snapshot)
+            make_transient_to_detached(user)
+            return db.merge(user, load=False)
+        
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            self._set(user)
+        return user
+    
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user from both tiers"""
+        self.local.delete(user_id)
+        if self.redis is not None:
+            try:
+                self.redis.delete(f"{self.REDIS_PREFIX}{user_id}")
+            except Exception as e:
+                logger.warning(f"User cache invalidation failed (redis): {e}")
+    
+    def stats(self) -> dict:
+        """Hit/miss counters for this process"""
+        total = self.hits + self.redis_hits + self.misses
+        return {
+            'backend': 'memory+redis' if self.redis is not None else 'memory',
+            'entries': len(self.local),
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.redis_hits) / total, 4) if total else 0.0
+        }
+    
+    def _get(self, user_id: int) -> Optional[dict]:
+        """Look up a snapshot in the local tier, then Redis"""
+        snapshot = self.local.get(user_id)
+        if snapshot is not None:
+            with self._stats_lock:
+                self.hits += 1
+            return snapshot
+        
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(f"{self.REDIS_PREFIX}{user_id}")
+            except Exception as e:
+                logger.warning(f"User cache read failed (redis): {e}")
+                payload = None
+            if payload is not None:
+                snapshot = _from_json(payload)
+                self.local.set(user_id, snapshot)
+                with self._stats_lock:
+                    self.redis_hits += 1
+                return snapshot
+        
+        with self._stats_lock:
+            self.misses += 1
+        return None
+    
+    def _set(self, user: User) -> None:
+        """Store a snapshot of a freshly loaded user in both tiers"""
+        snapshot = {column.key: getattr(user, column.key) for column in CACHED_COLUMNS}
+        self.local.set(user.id, snapshot)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"{self.REDIS_PREFIX}{user.id}", _to_json(snapshot), ex=settings.USER_CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"User cache write failed (redis): {e}")
+
+
+# Global instance
+user_cache = UserCache()
+
+
+# Session.info key for ids of users written in the current transaction
+PENDING_INVALIDATIONS = 'user_cache_pending'
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_user_write(mapper, connection, target: User) -> None:
+    """Note a user written by a flush; it is dropped from the cache on commit"""
+    session = object_session(target)
+    if session is None:
+        user_cache.invalidate(target.id)
+        return
+    session.info.setdefault(PENDING_INVALIDATIONS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    """
+    Drop users written in the committed transaction from the cache
+    
+    Done after commit rather than at flush: invalidating mid-transaction
+    lets a concurrent request re-cache the old row before the new one is
+    visible to it.
+    """
+    for user_id in session.info.pop(PENDING_INVALIDATIONS, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_users(session: Session, previous_transaction) -> None:
+    """Forget writes rolled back with the outermost transaction; the cached rows still match the database"""
+    if previous_transaction.parent is None and not previous_transaction.nested:
+        session.info.pop(PENDING_INVALIDATIONS, None)
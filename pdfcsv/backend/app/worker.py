@@ -0,0 +1,105 @@
+"""
+Celery Worker
+Queue-backed document processing, scaled separately from the API:
+
+    celery -A app.worker worker --loglevel=info
+
+Tasks only carry a document id; the worker reads the PDF from storage.
+"""
+from celery import Celery
+import asyncio
+import logging
+import threading
+from .core.config import settings
+from .core.database import PipelineSessionLocal
+from .services.processing_service import processing_service
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery("finflow", broker=settings.CELERY_BROKER_URL or settings.REDIS_URL)
+
+celery_app.conf.update(
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_default_queue="documents",
+    # Acknowledge only after processing so a crashed worker's job is redelivered
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # Threads, not prefork: OCR fans pages out to its own process pool,
+    # which daemonic prefork children are not allowed to create
+    worker_pool="threads",
+    worker_concurrency=settings.WORKER_CONCURRENCY,
+)
+
+
+_thread_state = threading.local()
+
+
+def _run_async(coro):
+    """
+    Run a coroutine on this worker thread's long-lived event loop
+    
+    Reusing one loop per thread (rather than asyncio.run per task) keeps
+    loop-bound resources such as the OpenAI client's connection pool alive
+    between tasks.
+    """
+    loop = getattr(_thread_state, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_state.loop = loop
+    return loop.run_until_complete(coro)
+
+
+def retry_countdown(retries: int) -> int:
+    """Seconds to wait before the next attempt, doubling with each retry"""
+    return settings.PROCESSING_RETRY_BACKOFF_SECONDS * (2 ** retries)
+
+
+@celery_app.task(bind=True, name="documents.process", max_retries=settings.PROCESSING_MAX_RETRIES)
+def process_document_task(self, document_id: int, use_cache: bool = True) -> dict:
+    """
+    Process a stored document, retrying transient failures with backoff
+    
+    The document stays in PROCESSING while a retry is pending and is only
+    marked ERROR once retries run out, so it can't be reprocessed meanwhile.
+    
+    With use_cache=False the OCR and GPT caches are not read (fresh results
+    still replace what they hold); retries keep the flag.
+    """
+    # Keep attributes loaded across commits so the async pipeline never
+    # lazy-loads (i.e. hits the database) from the event loop
+    db = PipelineSessionLocal(expire_on_commit=False)
+    try:
+        result = _run_async(processing_service.process_document(document_id, db, use_cache))
+        
+        if result['success']:
+            logger.info(f"Document {document_id} processed successfully")
+        elif result.get('retryable') and self.request.retries < self.max_retries:
+            countdown = retry_countdown(self.request.retries)
+            logger.warning(
+                f"Document {document_id} processing failed ({result.get('error')}); "
+                f"retrying in {countdown}s"
+            )
+            raise self.retry(countdown=countdown)
+        else:
+            logger.error(f"Document {document_id} processing failed: {result.get('error')}")
+            # A retryable failure leaves the document in PROCESSING (claimed)
+            # until here, when no retry is left; other failures are usually
+            # marked already, and mark_failed leaves those alone
+            processing_service.mark_failed(db, document_id, result.get('error'))
+    finally:
+        db.close()
+    
+    return result
+
+
+def enqueue_document_processing(document_id: int, use_cache: bool = True) -> None:
+    """
+    Queue a document for processing
+    
+    Pass use_cache=False to skip the OCR and GPT caches (a forced re-upload).
+    Blocks in eager mode (the task runs inline), so call it from a worker
+    thread rather than directly on the event loop.
+    """
+    logger.info(f"Queuing document {document_id} for processing")
+    process_document_task.delay(document_id, use_cache=use_cache)
@@ -0,0 +1,123 @@
+"""
+Transaction save stage: bulk insert vs one ORM object per row
+
+Times ProcessingService._save_transactions, which inserts all of a
+document's rows with one Core executemany, against the save stage it
+replaced, which built a Transaction per row and db.add()ed each, at
+statement sizes of 100, 1k and 10k rows. Both commit in the same way and
+each run saves into a fresh document. Run from the backend directory:
+
+    python -m benchmarks.bulk_insert --database-url postgresql+psycopg2://...
+
+Defaults to a throwaway SQLite file; tables are created with create_all, so
+a PostgreSQL target must be an empty database.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def statement_transactions(rows: int, seed: int = 7) -> list:
+    """Extracted transactions as the extraction stage hands them to the save stage"""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [
+        {
+            'transaction_date': start + timedelta(days=rng.randrange(365)),
+            'description': f"MERCHANT {rng.randrange(5000)} #{rng.randrange(10000):04d}",
+            'amount': rng.randrange(-50000, 50000) / 100,
+            'balance': rng.randrange(0, 1000000) / 100,
+            'category': 'Shopping',
+            'confidence': 90
+        }
+        for _ in range(rows)
+    ]
+
+
+def save_per_object(db, document, extraction_data: dict) -> int:
+    """The previous save stage: one ORM Transaction per row, added to the session"""
+    from sqlalchemy.sql import func
+    from app.models.document import DocumentStatus
+    from app.models.transaction import Transaction
+    
+    transaction_count = 0
+    for txn_data in extraction_data['transactions']:
+        transaction = Transaction(
+            document_id=document.id,
+            user_id=document.user_id,
+            transaction_date=txn_data['transaction_date'],
+            description=txn_data['description'],
+            amount=txn_data['amount'],
+            balance=txn_data.get('balance'),
+            category=txn_data['category'],
+            category_confidence=txn_data.get('confidence')
+        )
+        db.add(transaction)
+        transaction_count += 1
+    
+    document.status = DocumentStatus.READY
+    document.processed_at = func.now()
+    db.commit()
+    return transaction_count
+
+
+def time_save(save, user_id: int, extraction_data: dict) -> float:
+    """Seconds taken by one save into a new document"""
+    from app.core.database import SessionLocal
+    from app.models.document import Document, DocumentStatus
+    
+    with SessionLocal() as db:
+        document = Document(
+            user_id=user_id,
+            filename="statement.pdf",
+            file_path="uploads/statement.pdf",
+            file_size=1,
+            status=DocumentStatus.PROCESSING
+        )
+        db.add(document)
+        db.commit()
+        
+        started = time.perf_counter()
+        count = save(db, document, extraction_data)
+        elapsed = time.perf_counter() - started
+    
+    assert count == len(extraction_data['transactions'])
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5, help="best of this many runs per size")
+    args = parser.parse_args()
+    
+    # app.core.database builds its engines from DATABASE_URL at import
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bulk_insert.db"
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.user import User
+    from app.services.processing_service import ProcessingService
+    import app.models  # noqa: F401  (register every table)
+    
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        user = User(email=f"bulk-insert-{time.time_ns()}@example.com", hashed_password='x')
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    
+    bulk_insert = ProcessingService()._save_transactions
+    print(f"{engine.dialect.name}, best of {args.repeat}")
+    print(f"{'rows':>7} {'per-object ms':>14} {'bulk ms':>9} {'speedup':>8} {'bulk rows/s':>12}")
+    for rows in args.rows:
+        extraction_data = {'document_type': 'BANK_STATEMENT', 'transactions': statement_transactions(rows)}
+        per_object = min(time_save(save_per_object, user_id, extraction_data) for _ in range(args.repeat))
+        bulk = min(time_save(bulk_insert, user_id, extraction_data) for _ in range(args.repeat))
+        print(f"{rows:>7} {1000 * per_object:>14.1f} {1000 * bulk:>9.1f} {per_object / bulk:>7.1f}x {rows / bulk:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
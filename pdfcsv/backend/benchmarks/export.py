@@ -0,0 +1,114 @@
+"""
+Streamed export throughput and server memory
+
+Seeds --rows transactions for one user over --documents documents, starts
+the API under uvicorn and downloads CSV and OFX exports through
+/documents/{id}/export (one document's rows) and /transactions/export
+(every row), reporting rows/s and the server's peak RSS above its idle
+level. Exports read through yield_per, so the whole-account export should
+peak no higher than the single-document one. Linux only (reads /proc). Run
+from the backend directory:
+
+    python -m benchmarks.export --rows 500000 --database-url postgresql+psycopg2://...
+
+Defaults to a throwaway SQLite file; tables are created with create_all, so
+a PostgreSQL target must be an empty database. Exits non-zero when the
+whole-account export peaks more than --tolerance-mb above the
+single-document one.
+"""
+import argparse
+import os
+import socket
+import tempfile
+import time
+
+
+def export(base_url: str, path: str, token: str, export_format: str, server_pid: int) -> tuple:
+    """Download one export, discarding the body; returns (seconds, bytes, peak RSS above idle)"""
+    import httpx
+    from benchmarks.ocr_memory import PeakSampler, _tree_rss
+    
+    baseline = _tree_rss(server_pid)
+    size = 0
+    with PeakSampler(root=server_pid) as sampler:
+        started = time.perf_counter()
+        with httpx.stream(
+            "GET",
+            f"{base_url}{path}",
+            params={'format': export_format},
+            headers={'Authorization': f"Bearer {token}"},
+            timeout=600
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+    return elapsed, size, max(0, sampler.peak - baseline)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--documents', type=int, default=10)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'ofx'])
+    parser.add_argument('--tolerance-mb', type=float, default=32)
+    args = parser.parse_args()
+    
+    # app.core.database builds its engines from DATABASE_URL at import; the
+    # server subprocess inherits it
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/export.db"
+    from sqlalchemy import func
+    from sqlalchemy.orm import Session
+    from app.core.database import Base, engine
+    from app.core.security import create_access_token
+    from app.models.transaction import Transaction
+    from benchmarks.login_storm import start_server
+    from benchmarks.transactions_query_plan import seed
+    import app.models  # noqa: F401  (register every table)
+    
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    seed(engine, args.rows, users=1, documents_per_user=args.documents)
+    print(f"Seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+    
+    with Session(engine) as db:
+        document_rows = db.query(func.count(Transaction.id)).filter(Transaction.document_id == 1).scalar()
+    token = create_access_token({"sub": "1"})
+    
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    
+    exports = [
+        ("/documents/1/export", document_rows),
+        ("/transactions/export", args.rows),
+    ]
+    print(f"{'endpoint':<22} {'format':>6} {'rows':>8} {'MB':>7} {'seconds':>8} {'rows/s':>9} {'peak MB':>8}")
+    bounded = True
+    try:
+        for export_format in args.formats:
+            peaks = []
+            for path, rows in exports:
+                seconds, size, peak = export(base_url, path, token, export_format, server.pid)
+                peaks.append(peak)
+                print(
+                    f"{path:<22} {export_format:>6} {rows:>8} {size / 2**20:>7.1f} "
+                    f"{seconds:>8.2f} {rows / seconds:>9,.0f} {peak / 2**20:>8.1f}"
+                )
+            if peaks[-1] - peaks[0] > args.tolerance_mb * 2**20:
+                print(f"  {export_format}: exporting every row peaked {(peaks[-1] - peaks[0]) / 2**20:.1f}MB higher")
+                bounded = False
+    finally:
+        server.terminate()
+        server.wait()
+    
+    if not bounded:
+        raise SystemExit(1)
+    print("Peak server memory does not grow with the export size")
+
+
+if __name__ == '__main__':
+    main()
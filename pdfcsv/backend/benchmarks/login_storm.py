@@ -0,0 +1,176 @@
+"""
+/documents/ latency under a login storm
+
+Starts the API under uvicorn against a seeded database, then measures GET
+/documents/ latency from --readers concurrent clients, first on its own and
+then while --logins clients POST /auth/login in a loop. bcrypt runs on the
+password hashing pool (PASSWORD_HASH_WORKERS), so the storm should queue
+there and leave the request threadpool, and with it /documents/ p99, alone.
+Run from the backend directory:
+
+    python -m benchmarks.login_storm --readers 8 --logins 32 --seconds 15
+
+Defaults to a throwaway SQLite file; tables are created with create_all, so
+a PostgreSQL target (--database-url) must be an empty database. BCRYPT_ROUNDS
+and PASSWORD_HASH_WORKERS are read from the environment as usual.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+PASSWORD = "correct horse battery staple"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(documents: int, transactions_per_document: int) -> tuple:
+    """Create a reader with documents and a login user; returns (reader token, login email)"""
+    from sqlalchemy import insert
+    from app.core.database import Base, SessionLocal, engine
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.document import Document, DocumentStatus
+    from app.models.transaction import Transaction
+    from app.models.user import User
+    import app.models  # noqa: F401  (register every table)
+    
+    Base.metadata.create_all(engine)
+    suffix = time.time_ns()
+    with SessionLocal() as db:
+        reader = User(email=f"reader-{suffix}@example.com", hashed_password=get_password_hash(PASSWORD))
+        login_user = User(email=f"login-{suffix}@example.com", hashed_password=get_password_hash(PASSWORD))
+        db.add_all([reader, login_user])
+        db.commit()
+        
+        document_ids = db.execute(
+            insert(Document).returning(Document.id),
+            [
+                {
+                    'user_id': reader.id,
+                    'filename': f"statement-{n}.pdf",
+                    'file_path': f"uploads/statement-{n}.pdf",
+                    'file_size': 1,
+                    'status': DocumentStatus.READY
+                }
+                for n in range(documents)
+            ]
+        ).scalars().all()
+        db.execute(insert(Transaction), [
+            {
+                'document_id': document_id,
+                'user_id': reader.id,
+                'transaction_date': date(2024, 1, 1) + timedelta(days=n),
+                'description': f"MERCHANT {n}",
+                'amount': -12.5,
+                'category': 'Shopping'
+            }
+            for document_id in document_ids
+            for n in range(transactions_per_document)
+        ])
+        db.commit()
+        return create_access_token({"sub": str(reader.id)}), login_user.email
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Run the API under uvicorn and wait until /health answers"""
+    import httpx
+    
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy()
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("uvicorn exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("uvicorn did not start within 30s")
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_phase(base_url: str, token: str, email: str, readers: int, logins: int, seconds: float) -> tuple:
+    """Read /documents/ (and log in, if logins > 0) for the given time; returns (latencies, login count)"""
+    import httpx
+    
+    latencies = []
+    login_count = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=readers + logins)
+    
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def read() -> None:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get("/documents/", params={'limit': 50}, headers={'Authorization': f"Bearer {token}"})
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+        
+        async def log_in() -> None:
+            nonlocal login_count
+            while time.monotonic() < deadline:
+                response = await client.post("/auth/login", json={'email': email, 'password': PASSWORD})
+                response.raise_for_status()
+                login_count += 1
+        
+        await asyncio.gather(*[read() for _ in range(readers)], *[log_in() for _ in range(logins)])
+    return latencies, login_count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--transactions-per-document', type=int, default=20)
+    args = parser.parse_args()
+    
+    # app.core.database builds its engines from DATABASE_URL at import; the
+    # server subprocess inherits it
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/login_storm.db"
+    token, email = seed(args.documents, args.transactions_per_document)
+    
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+    
+    from app.core.config import settings
+    print(f"{os.cpu_count()} CPUs, BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}, PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}")
+    print(f"{'phase':<14} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'logins/s':>9}")
+    try:
+        # Warm up connections, routes and the user cache
+        asyncio.run(run_phase(base_url, token, email, args.readers, 0, 1))
+        for phase, logins in (("baseline", 0), (f"{args.logins} logins", args.logins)):
+            latencies, login_count = asyncio.run(
+                run_phase(base_url, token, email, args.readers, logins, args.seconds)
+            )
+            print(
+                f"{phase:<14} {len(latencies):>8} "
+                f"{1000 * percentile(latencies, 0.50):>8.1f} {1000 * percentile(latencies, 0.95):>8.1f} "
+                f"{1000 * percentile(latencies, 0.99):>8.1f} {1000 * max(latencies):>8.1f} "
+                f"{login_count / args.seconds:>9.1f}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
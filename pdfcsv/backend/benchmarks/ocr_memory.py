@@ -0,0 +1,140 @@
+"""
+Peak OCR memory vs page count
+
+OCRs synthetic image-only statements of increasing length while sampling
+the resident memory of the whole process tree (this process, the OCR
+workers and the pdftoppm/tesseract children). Pages are rendered one at a
+time and at most OCR_MAX_INFLIGHT_PAGES are in flight, so the peak should
+track the in-flight count, not the page count. Needs tesseract and
+poppler-utils on PATH; Linux only (reads /proc). Run from the backend
+directory:
+
+    python -m benchmarks.ocr_memory --pages 5 20 40 --inflight 1 4
+
+Exits non-zero when the peak for the longest statement is more than
+--tolerance above the peak for the shortest, at any in-flight count.
+"""
+import argparse
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def _process_tree(root: int) -> List[int]:
+    """Pids of root and all its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after its ')'
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    
+    pids, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _tree_rss(root: int) -> int:
+    """Resident bytes of a process tree"""
+    total = 0
+    for pid in _process_tree(root):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class PeakSampler:
+    """Samples a process tree's RSS (this process's by default) in a background thread and keeps the peak"""
+    
+    def __init__(self, interval: float = 0.02, root: Optional[int] = None):
+        self.interval = interval
+        self.root = root or os.getpid()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _tree_rss(self.root))
+            time.sleep(self.interval)
+    
+    def __enter__(self) -> "PeakSampler":
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def measure(pages: int, inflight: int, workers: int, dpi: int) -> int:
+    """
+    Peak tree RSS in bytes while OCR'ing a statement of the given length,
+    above the RSS just before OCR starts (which includes the PDF itself)
+    """
+    from app.core.config import settings
+    from app.services.ocr_service import OCRService
+    from benchmarks.synthetic_pdf import make_statement_pdf
+    
+    settings.OCR_DPI = dpi
+    settings.OCR_USE_TEXT_LAYER = False
+    settings.OCR_WORKERS = workers
+    settings.OCR_MAX_INFLIGHT_PAGES = inflight
+    
+    pdf_bytes = make_statement_pdf(pages)
+    service = OCRService()
+    baseline = _tree_rss(os.getpid())
+    try:
+        with PeakSampler() as sampler:
+            result = service.extract_text_from_pdf(pdf_bytes)
+    finally:
+        if service._executor is not None:
+            service._executor.shutdown()
+    if not result['success']:
+        raise SystemExit(f"OCR failed: {result['error']}")
+    return max(0, sampler.peak - baseline)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[5, 20, 40])
+    parser.add_argument('--inflight', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed peak growth, as a fraction")
+    args = parser.parse_args()
+    
+    pages = sorted(args.pages)
+    print(f"{'inflight':>8} {'pages':>6} {'peak MB':>9}  (above baseline)")
+    bounded = True
+    for inflight in args.inflight:
+        peaks = []
+        for page_count in pages:
+            peak = measure(page_count, inflight, args.workers, args.dpi)
+            peaks.append(peak)
+            print(f"{inflight:>8} {page_count:>6} {peak / 2**20:>9.1f}")
+        if peaks[-1] > peaks[0] * (1 + args.tolerance):
+            print(f"  peak grew {peaks[-1] / max(peaks[0], 1):.2f}x from {pages[0]} to {pages[-1]} pages")
+            bounded = False
+    
+    if not bounded:
+        raise SystemExit(1)
+    print("Peak memory is bounded by the in-flight page count")
+
+
+if __name__ == '__main__':
+    main()
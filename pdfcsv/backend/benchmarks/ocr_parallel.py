@@ -0,0 +1,69 @@
+"""
+Serial vs page-parallel Tesseract OCR
+
+OCRs a synthetic image-only statement once with OCR_WORKERS=1 and once per
+worker count given, and reports wall-clock time, speedup and whether the
+text came back identical (same pages, same order). Needs tesseract and
+poppler-utils on PATH. Run from the backend directory:
+
+    python -m benchmarks.ocr_parallel --pages 30 --workers 2 4 8
+"""
+import argparse
+import os
+import time
+
+
+def run(pdf_bytes: bytes, workers: int) -> tuple:
+    """OCR the PDF with a fresh service and the given worker count; returns (seconds, result)"""
+    from app.core.config import settings
+    from app.services.ocr_service import OCRService
+    
+    settings.OCR_WORKERS = workers
+    service = OCRService()
+    if workers > 1:
+        # Start the pool outside the timing; the API keeps it warm between documents
+        service._get_executor().submit(int).result()
+    
+    started = time.perf_counter()
+    result = service.extract_text_from_pdf(pdf_bytes)
+    elapsed = time.perf_counter() - started
+    
+    if service._executor is not None:
+        service._executor.shutdown()
+    if not result['success']:
+        raise SystemExit(f"OCR failed: {result['error']}")
+    return elapsed, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=30)
+    parser.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 2])
+    parser.add_argument('--dpi', type=int, default=300)
+    args = parser.parse_args()
+    
+    from app.core.config import settings
+    from benchmarks.synthetic_pdf import make_statement_pdf
+    
+    settings.OCR_DPI = args.dpi
+    settings.OCR_USE_TEXT_LAYER = False
+    pdf_bytes = make_statement_pdf(args.pages)
+    print(f"{args.pages} pages at {args.dpi} DPI, {os.cpu_count()} CPUs")
+    
+    serial_time, serial = run(pdf_bytes, 1)
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}  identical")
+    print(f"{1:>8} {serial_time:>9.2f} {1:>8.2f}x  -")
+    
+    for workers in args.workers:
+        if workers <= 1:
+            continue
+        elapsed, result = run(pdf_bytes, workers)
+        identical = (
+            result['extracted_text'] == serial['extracted_text']
+            and result['pages'] == serial['pages']
+        )
+        print(f"{workers:>8} {elapsed:>9.2f} {serial_time / elapsed:>8.2f}x  {'yes' if identical else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Synthetic scanned bank statements for the OCR benchmarks
+
+Pages are images only (no text layer), so every page goes through OCR.
+"""
+import io
+import random
+from datetime import date, timedelta
+from typing import List
+
+from PIL import Image, ImageDraw, ImageFont
+
+# US letter at 300 DPI
+PAGE_SIZE = (2550, 3300)
+RESOLUTION = 300
+LINES_PER_PAGE = 40
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has only the small bitmap font
+        return ImageFont.load_default()
+
+
+def statement_lines(pages: int, seed: int = 7) -> List[List[str]]:
+    """Statement rows per page: date, description, amount and running balance"""
+    rng = random.Random(seed)
+    merchants = ['STARBUCKS', 'SHELL OIL', 'AMAZON MKTPLACE', 'PAYROLL DEPOSIT', 'WHOLEFOODS', 'COMCAST']
+    day = date(2024, 1, 2)
+    balance = 5000.0
+    result = []
+    for page in range(pages):
+        lines = [f"ACME BANK  STATEMENT  PAGE {page + 1} OF {pages}"]
+        for _ in range(LINES_PER_PAGE):
+            amount = round(rng.uniform(-250, 250), 2)
+            balance = round(balance + amount, 2)
+            lines.append(f"{day:%m/%d/%Y}  {rng.choice(merchants)} #{rng.randrange(1000, 9999)}  {amount:.2f}  {balance:.2f}")
+            day += timedelta(days=rng.randrange(0, 2))
+        result.append(lines)
+    return result
+
+
+def make_statement_pdf(pages: int, seed: int = 7) -> bytes:
+    """Render a scanned-looking statement of the given page count as PDF bytes"""
+    font = _font(40)
+    images = []
+    for lines in statement_lines(pages, seed):
+        image = Image.new('L', PAGE_SIZE, color=255)
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(lines):
+            draw.text((150, 150 + i * 75), line, fill=0, font=font)
+        images.append(image)
+    
+    output = io.BytesIO()
+    images[0].save(output, format='PDF', save_all=True, append_images=images[1:], resolution=RESOLUTION)
+    for image in images:
+        image.close()
+    return output.getvalue()
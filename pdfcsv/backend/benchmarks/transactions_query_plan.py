@@ -0,0 +1,145 @@
+"""
+GET /transactions query plan at scale
+
+Seeds a database with --rows transactions spread over --users users, then
+prints the plan and timing of the list query (first page and a cursor
+page, and a first page filtered to one --category) exactly as the endpoint
+builds it. Run from the backend directory:
+
+    python -m benchmarks.transactions_query_plan --database-url postgresql+psycopg2://...
+
+PostgreSQL gets EXPLAIN (ANALYZE, BUFFERS); SQLite gets EXPLAIN QUERY PLAN.
+The target database must be empty: tables are created with create_all.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+CATEGORIES = ['Shopping', 'Dining', 'Travel', 'Utilities', 'Groceries', 'Fuel', 'Software', 'Office Supplies']
+
+
+def seed(engine, rows: int, users: int, documents_per_user: int, batch_size: int = 20000) -> None:
+    """Insert users, documents and transactions in bulk"""
+    from sqlalchemy import insert
+    from app.models.document import Document, DocumentStatus
+    from app.models.transaction import Transaction
+    from app.models.user import User
+    
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {'id': user_id, 'email': f"user{user_id}@example.com", 'hashed_password': 'x'}
+            for user_id in range(1, users + 1)
+        ])
+        connection.execute(insert(Document), [
+            {
+                'id': (user_id - 1) * documents_per_user + n + 1,
+                'user_id': user_id,
+                'filename': f"statement-{n}.pdf",
+                'file_path': f"uploads/{user_id}-{n}.pdf",
+                'file_size': 1,
+                'status': DocumentStatus.READY
+            }
+            for user_id in range(1, users + 1)
+            for n in range(documents_per_user)
+        ])
+        
+        batch = []
+        for i in range(rows):
+            document_id = rng.randrange(users * documents_per_user) + 1
+            batch.append({
+                'document_id': document_id,
+                'user_id': (document_id - 1) // documents_per_user + 1,
+                'transaction_date': start + timedelta(days=rng.randrange(5 * 365)),
+                'description': f"MERCHANT {rng.randrange(5000)}",
+                'amount': rng.randrange(-50000, 50000) / 100,
+                'category': rng.choice(CATEGORIES)
+            })
+            if len(batch) == batch_size:
+                connection.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Transaction), batch)
+        
+        if engine.dialect.name == 'postgresql':
+            connection.exec_driver_sql("ANALYZE")
+
+
+def explain(engine, statement) -> str:
+    """Plan for a compiled statement, with literal parameters"""
+    sql = str(statement.compile(engine, compile_kwargs={'literal_binds': True}))
+    prefix = "EXPLAIN (ANALYZE, BUFFERS)" if engine.dialect.name == 'postgresql' else "EXPLAIN QUERY PLAN"
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"{prefix} {sql}").all()
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', 'sqlite:///transactions_plan.db'))
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--documents-per-user', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--category', default='Travel', choices=CATEGORIES)
+    args = parser.parse_args()
+    
+    # app.core.database builds its engines from DATABASE_URL at import
+    os.environ['DATABASE_URL'] = args.database_url
+    from sqlalchemy import tuple_
+    from sqlalchemy.orm import Session
+    from app.core.database import Base, engine
+    from app.models.transaction import Transaction
+    import app.models  # noqa: F401  (register every table)
+    
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    seed(engine, args.rows, args.users, args.documents_per_user)
+    print(f"Seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+    
+    user_id = args.users // 2
+    with Session(engine) as db:
+        # Same query as list_transactions
+        query = (
+            db.query(Transaction)
+            .filter(Transaction.user_id == user_id)
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(args.limit + 1)
+        )
+        
+        started = time.perf_counter()
+        page = query.all()
+        print(f"\nFirst page: {len(page)} rows in {1000 * (time.perf_counter() - started):.1f}ms")
+        print(explain(engine, query.statement))
+        
+        last = page[-1]
+        cursor_query = (
+            db.query(Transaction)
+            .filter(Transaction.user_id == user_id)
+            .filter(tuple_(Transaction.transaction_date, Transaction.id) < tuple_(last.transaction_date, last.id))
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(args.limit + 1)
+        )
+        started = time.perf_counter()
+        page = cursor_query.all()
+        print(f"\nCursor page: {len(page)} rows in {1000 * (time.perf_counter() - started):.1f}ms")
+        print(explain(engine, cursor_query.statement))
+        
+        category_query = (
+            db.query(Transaction)
+            .filter(Transaction.user_id == user_id)
+            .filter(Transaction.category == args.category)
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(args.limit + 1)
+        )
+        started = time.perf_counter()
+        page = category_query.all()
+        print(f"\nCategory page ({args.category}): {len(page)} rows in {1000 * (time.perf_counter() - started):.1f}ms")
+        print(explain(engine, category_query.statement))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,109 @@
 #!/usr/bin/env python3
-"""Startup script for Railway deployment"""
+"""
+Startup script for Railway deployment
+
+    python start.py          # API (uvicorn)
+    python start.py worker   # Celery document processing worker
+    python start.py migrate  # Apply database migrations and exit
+
+The role can also be set with PROCESS_TYPE, so one image serves both the
+API and the worker service. The API applies migrations before it starts
+unless MIGRATE_ON_STARTUP=false.
+"""
 import os
+import subprocess
 import sys
 
-# Get PORT from environment, default to 8000
-port = int(os.getenv("PORT", "8000"))
 
-print(f"Starting uvicorn on port {port}...")
+def _unstamped_revision():
+    """
+    Revision to stamp a database that has tables but no migration history
+    
+    Databases created by Base.metadata.create_all before migrations existed
+    match the baseline (0001); one created from the current models already
+    has the newest column (transactions.user_id) and is at head. Returns
+    None when the database is empty or already under Alembic.
+    """
+    from sqlalchemy import create_engine, inspect
+    from app.core.config import settings
+    
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        inspector = inspect(engine)
+        tables = set(inspector.get_table_names())
+        if "alembic_version" in tables or "users" not in tables:
+            return None
+        
+        transaction_columns = {column["name"] for column in inspector.get_columns("transactions")}
+        if "user_id" in transaction_columns:
+            return "head"
+        
+        document_columns = {column["name"] for column in inspector.get_columns("documents")}
+        user_columns = {column["name"] for column in inspector.get_columns("users")}
+        if (
+            "merchant_categories" not in tables
+            and "category_rules" not in user_columns
+            and not document_columns & {"content_hash", "extraction_data", "ocr_pages"}
+        ):
+            return "0001"
+    finally:
+        engine.dispose()
+    
+    sys.exit(
+        "The database has tables but no migration history, and matches neither the "
+        "baseline nor the current schema. Stamp it by hand (alembic stamp <revision>) "
+        "and start again."
+    )
+
 
-# Start uvicorn programmatically
-import uvicorn
+def run_migrations():
+    """Apply database migrations, first stamping a database created before migrations existed"""
+    revision = _unstamped_revision()
+    if revision is not None:
+        print(f"Database has no migration history; stamping it at {revision}...")
+        subprocess.run([sys.executable, "-m", "alembic", "stamp", revision], check=True)
+    
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], check=True)
 
-if __name__ == "__main__":
+
+def run_web():
+    """Apply migrations (unless MIGRATE_ON_STARTUP=false) and serve the API"""
+    # Get PORT from environment, default to 8000
+    port = int(os.getenv("PORT", "8000"))
+    
+    # The app no longer creates tables on import
+    from app.core.config import settings
+    
+    if settings.MIGRATE_ON_STARTUP:
+        run_migrations()
+    
+    print(f"Starting uvicorn on port {port}...")
+    
+    # Start uvicorn programmatically
+    import uvicorn
+    
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=port,
         log_level="info"
     )
+
+
+def run_worker():
+    """Replace this process with a Celery worker (concurrency comes from WORKER_CONCURRENCY)"""
+    print("Starting Celery worker...")
+    os.execvp(sys.executable, [sys.executable, "-m", "celery", "-A", "app.worker", "worker", "--loglevel=info"])
+
+
+if __name__ == "__main__":
+    role = sys.argv[1] if len(sys.argv) > 1 else os.getenv("PROCESS_TYPE", "web")
+    
+    if role == "worker":
+        run_worker()
+    elif role == "web":
+        run_web()
+    elif role == "migrate":
+        run_migrations()
+    else:
+        sys.exit(f"Unknown process type '{role}' (expected 'web', 'worker' or 'migrate')")
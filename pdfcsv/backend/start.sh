@@ -1,10 +1,31 @@
 #!/bin/bash
 # Startup script for Railway
+#
+#   ./start.sh          # API (uvicorn)
+#   ./start.sh worker   # Celery document processing worker
+#   ./start.sh migrate  # Apply database migrations and exit
+
+ROLE=${1:-${PROCESS_TYPE:-web}}
+
+if [ "$ROLE" = "worker" ]; then
+    echo "Starting Celery worker..."
+    exec celery -A app.worker worker --loglevel=info
+fi
+
+if [ "$ROLE" = "migrate" ]; then
+    exec python start.py migrate
+fi
 
 # Use Railway's PORT or default to 8000
 PORT=${PORT:-8000}
 
+# Apply database migrations (the app no longer creates tables on import),
+# stamping databases created before migrations existed; see start.py
+if [ "${MIGRATE_ON_STARTUP:-true}" = "true" ]; then
+    python start.py migrate || exit 1
+fi
+
 echo "Starting uvicorn on port $PORT..."
 
 # Start uvicorn
-uvicorn app.main:app --host 0.0.0.0 --port $PORT
+exec uvicorn app.main:app --host 0.0.0.0 --port $PORT
@@ -0,0 +1,67 @@
+"""
+Test settings and shared fixtures
+
+Settings are read from the environment when app.core.config is first
+imported, so they are set here, before any test module imports the app.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="finflow-tests-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{TEST_DIR}/test.db")
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+
+
+@pytest.fixture
+def db():
+    """A session on the test database, with every table created"""
+    from app.core.database import Base, SessionLocal, engine
+    from app import models  # noqa: F401  (register every table)
+    
+    Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def user(db):
+    """A new user, unique per test"""
+    from app.models.user import User
+    
+    user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    """Bearer token headers for the user fixture"""
+    from app.core.security import create_access_token
+    
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.fixture
+def make_document(db, user):
+    """Factory for documents owned by the user fixture"""
+    from app.models.document import Document, DocumentStatus
+    
+    def make(**values):
+        document = Document(
+            user_id=user.id,
+            filename="statement.pdf",
+            file_path=f"uploads/{uuid.uuid4()}.pdf",
+            file_size=1,
+            status=values.pop("status", DocumentStatus.UPLOADED),
+            **values
+        )
+        db.add(document)
+        db.commit()
+        return document
+    
+    return make
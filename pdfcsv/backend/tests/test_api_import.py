@@ -0,0 +1,59 @@
+"""
+What importing the API loads
+
+Imports app.main in a fresh interpreter and checks that it neither loads the
+worker and pipeline stack (Celery, OCR, OpenAI, boto3) nor creates tables;
+the schema belongs to Alembic. These are what made API startup slow, and
+checking them directly doesn't depend on how fast the machine is.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only the worker needs these; API processes load them on first use
+PIPELINE_MODULES = [
+    "celery",
+    "app.worker",
+    "app.services.processing_service",
+    "app.services.ocr_service",
+    "app.services.ocr_cache",
+    "app.services.extraction_service",
+    "openai",
+    "boto3",
+    "PIL",
+    "pytesseract",
+    "pdf2image",
+]
+
+# Records create_all calls made while app.main is imported
+IMPORT_API = """
+import json, sys
+from sqlalchemy import MetaData
+create_all_calls = []
+MetaData.create_all = lambda self, *args, **kwargs: create_all_calls.append(sorted(self.tables))
+import app.main
+print(json.dumps({"modules": sorted(sys.modules), "create_all_calls": create_all_calls}))
+"""
+
+
+@pytest.fixture(scope="module")
+def api_import() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_API], cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_api_import_skips_pipeline_modules(api_import):
+    loaded = [module for module in PIPELINE_MODULES if module in api_import["modules"]]
+    assert loaded == []
+
+
+def test_api_import_creates_no_tables(api_import):
+    assert api_import["create_all_calls"] == []
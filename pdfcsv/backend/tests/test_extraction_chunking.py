@@ -0,0 +1,162 @@
+"""
+Chunked GPT extraction against a local fake OpenAI server
+
+The server answers chat completions by parsing the "TXN ..." rows out of the
+statement text in the prompt, after a fixed delay, and records how many
+requests were in flight at once. That makes chunk boundaries, overlap
+deduplication and the concurrency limit checkable offline.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services.extraction_service import ExtractionService
+
+RESPONSE_DELAY_SECONDS = 0.2
+STATEMENT_MARKER = "Bank Statement Text:\n"
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """Chat completions endpoint that extracts rows formatted as 'TXN date | description | amount | balance'"""
+    
+    daemon_threads = True
+    
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.requests = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: FakeOpenAI
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.inflight += 1
+            self.server.peak_inflight = max(self.server.peak_inflight, self.server.inflight)
+        try:
+            time.sleep(RESPONSE_DELAY_SECONDS)
+            prompt = body["messages"][-1]["content"]
+            statement = prompt.split(STATEMENT_MARKER, 1)[1]
+            transactions = []
+            for line in statement.splitlines():
+                if line.startswith("TXN "):
+                    txn_date, description, amount, balance = (part.strip() for part in line[4:].split("|"))
+                    transactions.append({
+                        "date": txn_date,
+                        "description": description,
+                        "amount": float(amount),
+                        "balance": float(balance)
+                    })
+            payload = json.dumps({
+                "id": f"chatcmpl-{self.server.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps({"transactions": transactions})},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 10, "total_tokens": len(prompt) // 4 + 10}
+            }).encode("utf-8")
+        finally:
+            with self.server.lock:
+                self.server.inflight -= 1
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = FakeOpenAI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(settings, "EXTRACTION_CHUNK_CHARS", 1000)
+    monkeypatch.setattr(settings, "EXTRACTION_CHUNK_OVERLAP_LINES", 3)
+    monkeypatch.setattr(settings, "EXTRACTION_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    # Always take the GPT path
+    monkeypatch.setattr(settings, "RULE_PARSER_MIN_CONFIDENCE", 101)
+    yield server
+    
+    server.shutdown()
+    server.server_close()
+
+
+def _statement(rows: int) -> str:
+    """Statement text with one TXN row per transaction and some page furniture"""
+    lines = ["ACME BANK CHECKING STATEMENT"]
+    balance = 1000.0
+    for i in range(rows):
+        if i and i % 25 == 0:
+            lines.append(f"Page {i // 25 + 1}")
+        amount = -(i % 17) - 1.25
+        balance = round(balance + amount, 2)
+        lines.append(f"TXN 2024-01-{i % 28 + 1:02d} | COFFEE SHOP {i} | {amount:.2f} | {balance:.2f}")
+    return "\n".join(lines)
+
+
+def test_long_statement_is_extracted_in_full_across_chunks(fake_openai):
+    service = ExtractionService()
+    ocr_text = _statement(200)
+    chunks = service._chunk_text(ocr_text)
+    assert len(chunks) > 5
+    
+    result = asyncio.run(service.extract_transactions(ocr_text))
+    
+    assert result["success"], result["error"]
+    descriptions = [txn["description"] for txn in result["transactions"]]
+    # Every row once, in statement order: nothing truncated, overlaps deduplicated
+    assert descriptions == [f"COFFEE SHOP {i}" for i in range(200)]
+    assert fake_openai.requests == len(chunks)
+
+
+def test_repeated_rows_within_a_chunk_survive_deduplication(fake_openai):
+    service = ExtractionService()
+    row = "TXN 2024-01-05 | STARBUCKS | -4.50 | 995.50"
+    ocr_text = "\n".join([_statement(60), row, row, _statement(60).replace("COFFEE SHOP", "BAKERY")])
+    
+    result = asyncio.run(service.extract_transactions(ocr_text))
+    
+    assert result["success"], result["error"]
+    assert [txn["description"] for txn in result["transactions"]].count("STARBUCKS") == 2
+
+
+def test_chunks_run_concurrently_within_the_limit(fake_openai):
+    service = ExtractionService()
+    ocr_text = _statement(300)
+    chunk_count = len(service._chunk_text(ocr_text))
+    
+    started = time.perf_counter()
+    result = asyncio.run(service.extract_transactions(ocr_text))
+    elapsed = time.perf_counter() - started
+    
+    assert result["success"], result["error"]
+    assert fake_openai.peak_inflight == settings.EXTRACTION_MAX_CONCURRENCY
+    # Serial calls would take chunk_count delays; the limit allows 3 at a time
+    serial_seconds = chunk_count * RESPONSE_DELAY_SECONDS
+    assert elapsed < serial_seconds / 2, f"{chunk_count} chunks took {elapsed:.2f}s (serial: {serial_seconds:.2f}s)"
@@ -0,0 +1,156 @@
+"""
+/health latency while uploads are in progress
+
+Storage writes and the queue hand-off are made slow (as S3 part uploads and
+a remote broker are), /health is polled with nothing else running, then
+several uploads are started at once and /health is polled until they
+finish. Upload I/O runs in the threadpool, so health checks answer about as
+fast as when idle; a blocking call on the event loop would hold most of
+them up for a whole storage write. Comparing against the idle baseline
+keeps the check independent of how fast the machine is.
+"""
+import asyncio
+import gc
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+import pytest
+
+from app.api import documents
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.services.storage_service import LocalStorage
+from app import models  # noqa: F401  (register every table)
+
+# Health checks in the idle baseline
+IDLE_CHECKS = 30
+# Allowed slowdown of the median and 90th percentile health check against
+# idle; a blocked event loop makes them about a hundred times slower
+HEALTH_SLOWDOWN_FACTOR = 5
+
+CONCURRENT_UPLOADS = 8
+# Small chunks keep multipart parsing (which Starlette does on the loop) out
+# of the measurement while still giving each upload several storage writes
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_BYTES = 4 * UPLOAD_CHUNK_SIZE
+WRITE_DELAY_SECONDS = 0.15
+ENQUEUE_DELAY_SECONDS = 0.2
+
+
+class SlowStorage(LocalStorage):
+    """Local storage whose writes take as long as a remote part upload"""
+    
+    def open_writer(self, key: str):
+        writer = super().open_writer(key)
+        write = writer.write
+        
+        def slow_write(chunk: bytes) -> None:
+            time.sleep(WRITE_DELAY_SECONDS)
+            write(chunk)
+        
+        writer.write = slow_write
+        return writer
+
+
+@pytest.fixture
+def upload_env(monkeypatch, tmp_path):
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": str(user.id)})
+    
+    enqueued = []
+    
+    def slow_enqueue(document_id: int, use_cache: bool = True) -> None:
+        time.sleep(ENQUEUE_DELAY_SECONDS)
+        enqueued.append(document_id)
+    
+    storage = SlowStorage(str(tmp_path))
+    monkeypatch.setattr(documents, "get_storage", lambda: storage)
+    monkeypatch.setattr(documents, "_enqueue_processing", slow_enqueue)
+    monkeypatch.setattr(documents, "UPLOAD_CHUNK_SIZE", UPLOAD_CHUNK_SIZE)
+    return {"Authorization": f"Bearer {token}"}, enqueued
+
+
+def _p90(latencies: list) -> float:
+    return statistics.quantiles(latencies, n=10)[-1]
+
+
+async def _poll_health(client: httpx.AsyncClient, done) -> list:
+    """Poll /health until done(latencies so far) is true; returns each check's latency"""
+    latencies = []
+    while not done(latencies):
+        started = time.perf_counter()
+        response = await client.get("/health")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def _upload_while_polling_health(headers: dict) -> tuple:
+    """
+    Poll /health with nothing else running, then while the uploads run
+    
+    Returns (upload responses, idle latencies, latencies during uploads).
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        # Warm up the routes, dependencies and threadpool the measured requests use
+        warm_up = await client.post(
+            "/documents/upload",
+            headers=headers,
+            files={"file": ("warm-up.pdf", os.urandom(UPLOAD_BYTES), "application/pdf")}
+        )
+        assert warm_up.status_code == 201
+        
+        requests = [
+            client.build_request(
+                "POST",
+                "/documents/upload",
+                headers=headers,
+                files={"file": (f"statement-{n}.pdf", os.urandom(UPLOAD_BYTES), "application/pdf")}
+            )
+            for n in range(CONCURRENT_UPLOADS)
+        ]
+        # Encode the multipart bodies up front: the client shares the app's
+        # event loop here, and its encoding work is not the server's
+        for request in requests:
+            await request.aread()
+        # Start from a clean heap so a full collection of garbage left by
+        # earlier tests doesn't land on a health check
+        gc.collect()
+        
+        idle = await _poll_health(client, lambda latencies: len(latencies) >= IDLE_CHECKS)
+        uploads = [asyncio.create_task(client.send(request)) for request in requests]
+        loaded = await _poll_health(client, lambda latencies: all(upload.done() for upload in uploads))
+        
+        return [upload.result() for upload in uploads], idle, loaded
+
+
+def test_health_stays_fast_during_uploads(upload_env):
+    headers, enqueued = upload_env
+    
+    started = time.perf_counter()
+    responses, idle, loaded = asyncio.run(_upload_while_polling_health(headers))
+    upload_seconds = time.perf_counter() - started
+    
+    assert [response.status_code for response in responses] == [201] * CONCURRENT_UPLOADS
+    assert set(response.json()["id"] for response in responses) <= set(enqueued)
+    
+    # Each upload spends at least this long in storage and the queue
+    assert upload_seconds >= 4 * WRITE_DELAY_SECONDS + ENQUEUE_DELAY_SECONDS
+    assert len(loaded) >= 10
+    for name, statistic in (("median", statistics.median), ("p90", _p90)):
+        idle_seconds, loaded_seconds = statistic(idle), statistic(loaded)
+        assert loaded_seconds < HEALTH_SLOWDOWN_FACTOR * idle_seconds, (
+            f"{name} /health took {1000 * loaded_seconds:.1f}ms during uploads "
+            f"against {1000 * idle_seconds:.1f}ms idle"
+        )
@@ -0,0 +1,130 @@
+"""
+LLM categorization batching and caching, against FakeCategoryModel
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.categorizer import UNCATEGORIZED
+from app.services.llm_categorizer import FakeCategoryModel, LLMCategorizer
+
+CATEGORIES = ["Coffee", "Dining", "Shopping", "Travel"]
+
+
+@pytest.fixture(autouse=True)
+def llm_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CATEGORIZATION_LLM_ENABLED", True)
+    monkeypatch.setattr(settings, "CATEGORIZATION_CACHE_REDIS", False)
+    monkeypatch.setattr(settings, "CATEGORIZATION_MIN_CONFIDENCE", 60)
+    monkeypatch.setattr(settings, "CATEGORIZATION_BATCH_SIZE", 50)
+
+
+@pytest.fixture
+def model():
+    return FakeCategoryModel()
+
+
+@pytest.fixture
+def categorizer(model):
+    return LLMCategorizer(model)
+
+
+def _txn(description: str, confidence: int = 0, category: str = UNCATEGORIZED) -> dict:
+    return {'description': description, 'category': category, 'confidence': confidence}
+
+
+def _sent(model: FakeCategoryModel) -> list:
+    return [description for batch in model.sent for description in batch]
+
+
+def test_only_low_confidence_rows_are_sent(categorizer, model):
+    transactions = [
+        _txn("BLUE BOTTLE COFFEE OAKLAND CA", confidence=0),
+        _txn("AMAZON MKTPLACE", confidence=80, category="Shopping"),
+        _txn("DELTA AIR LINES", confidence=59),
+        _txn("WALMART SUPERCENTER", confidence=60, category="Shopping"),
+    ]
+    
+    changed = asyncio.run(categorizer.refine(transactions, CATEGORIES))
+    
+    assert _sent(model) == ["BLUE BOTTLE COFFEE OAKLAND CA", "DELTA AIR LINES"]
+    assert changed == 2
+    assert transactions[1] == _txn("AMAZON MKTPLACE", confidence=80, category="Shopping")
+    assert transactions[3] == _txn("WALMART SUPERCENTER", confidence=60, category="Shopping")
+    for txn in (transactions[0], transactions[2]):
+        assert txn['category'] in CATEGORIES
+        assert txn['confidence'] == FakeCategoryModel.CONFIDENCE
+
+
+def test_merchants_are_asked_about_once_per_batch(categorizer, model):
+    transactions = [
+        _txn("POS PURCHASE 04/12 SHELL OIL 12345 HOUSTON TX"),
+        _txn("POS PURCHASE 05/02 SHELL OIL 67890 HOUSTON TX"),
+        _txn("SHELL OIL 555 HOUSTON"),
+        _txn("CHIPOTLE 0917 AUSTIN TX"),
+    ]
+    
+    changed = asyncio.run(categorizer.refine(transactions, CATEGORIES))
+    
+    assert _sent(model) == ["POS PURCHASE 04/12 SHELL OIL 12345 HOUSTON TX", "CHIPOTLE 0917 AUSTIN TX"]
+    # Every row of a merchant takes the one answer
+    assert changed == 4
+    assert len({txn['category'] for txn in transactions[:3]}) == 1
+
+
+def test_batch_size_is_respected(categorizer, model, monkeypatch):
+    monkeypatch.setattr(settings, "CATEGORIZATION_BATCH_SIZE", 4)
+    transactions = [_txn(f"MERCHANT {name} STORE") for name in "ABCDEFGHIJ"]
+    
+    asyncio.run(categorizer.refine(transactions, CATEGORIES))
+    
+    assert [len(batch) for batch in model.sent] == [4, 4, 2]
+    assert categorizer.stats()['batches'] == 3
+
+
+def test_second_refine_is_served_from_the_cache(categorizer, model):
+    first = [_txn("BLUE BOTTLE COFFEE 0042"), _txn("DELTA AIR LINES 0067")]
+    asyncio.run(categorizer.refine(first, CATEGORIES))
+    model.sent.clear()
+    
+    # Same merchants, different store numbers, as in another user's statement
+    second = [_txn("BLUE BOTTLE COFFEE 1187"), _txn("DELTA AIR LINES 9120")]
+    changed = asyncio.run(categorizer.refine(second, CATEGORIES))
+    
+    assert model.sent == []
+    assert changed == 2
+    assert [txn['category'] for txn in second] == [txn['category'] for txn in first]
+    stats = categorizer.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+
+def test_use_cache_false_asks_again(categorizer, model):
+    asyncio.run(categorizer.refine([_txn("BLUE BOTTLE COFFEE")], CATEGORIES))
+    
+    asyncio.run(categorizer.refine([_txn("BLUE BOTTLE COFFEE")], CATEGORIES, use_cache=False))
+    
+    assert model.sent == [["BLUE BOTTLE COFFEE"], ["BLUE BOTTLE COFFEE"]]
+
+
+def test_categories_outside_the_allowed_set_are_dropped():
+    class OffListModel(FakeCategoryModel):
+        async def categorize_batch(self, descriptions, categories, use_cache=True):
+            answers = await super().categorize_batch(descriptions, categories, use_cache)
+            return [("Crypto", 99) if "COINBASE" in description else answer
+                    for description, answer in zip(descriptions, answers)]
+    
+    model = OffListModel()
+    categorizer = LLMCategorizer(model)
+    transactions = [_txn("COINBASE.COM 8842", confidence=20, category="Shopping"), _txn("BLUE BOTTLE COFFEE")]
+    
+    changed = asyncio.run(categorizer.refine(transactions, CATEGORIES))
+    
+    assert changed == 1
+    assert transactions[0] == _txn("COINBASE.COM 8842", confidence=20, category="Shopping")
+    assert transactions[1]['category'] in CATEGORIES
+    
+    # The rejected answer isn't cached either; the merchant is asked about again
+    model.sent.clear()
+    asyncio.run(categorizer.refine([_txn("COINBASE.COM 1234")], CATEGORIES))
+    assert model.sent == [["COINBASE.COM 1234"]]
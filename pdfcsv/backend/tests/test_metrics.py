@@ -0,0 +1,63 @@
+"""
+/metrics: opt-in, and read-only towards the pipeline services
+"""
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# In a fresh interpreter, nothing has loaded the pipeline services yet
+FRESH_API_METRICS = """
+import json, sys
+from fastapi.testclient import TestClient
+from app.main import app
+body = TestClient(app).get("/metrics").json()
+loaded = [name for name in ("app.services.ocr_cache", "app.services.extraction_service",
+                            "app.services.llm_categorizer", "openai", "redis") if name in sys.modules]
+print(json.dumps({"body": body, "loaded": loaded}))
+"""
+
+
+def test_metrics_are_off_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    
+    assert TestClient(app).get("/metrics").status_code == 404
+
+
+def test_metrics_do_not_construct_services():
+    env = dict(os.environ, METRICS_ENABLED="true")
+    result = subprocess.run(
+        [sys.executable, "-c", FRESH_API_METRICS], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    output = json.loads(result.stdout.splitlines()[-1])
+    
+    assert output["loaded"] == []
+    body = output["body"]
+    assert (body["ocr_cache"], body["extraction"], body["llm_categorizer"]) == (None, None, None)
+    assert "user_cache" in body and "database" in body
+
+
+def test_metrics_report_services_in_use(monkeypatch):
+    from app.services.extraction_service import get_extraction_service
+    from app.services.llm_categorizer import get_llm_categorizer
+    
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    monkeypatch.setattr(settings, "CATEGORIZATION_FAKE_LLM", True)
+    get_llm_categorizer.cache_clear()
+    get_extraction_service()
+    get_llm_categorizer()
+    try:
+        body = TestClient(app).get("/metrics").json()
+    finally:
+        get_llm_categorizer.cache_clear()
+    
+    assert body["extraction"] == get_extraction_service().stats()
+    assert body["llm_categorizer"]["batches"] == 0
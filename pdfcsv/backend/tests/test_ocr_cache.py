@@ -0,0 +1,115 @@
+"""
+Redis OCR cache eviction, against fakeredis
+"""
+import json
+
+import fakeredis
+import pytest
+
+from app.services.ocr_cache import RedisOCRCache
+
+# Each entry below serializes to ENTRY_BYTES
+ENTRY_BYTES = len(json.dumps({
+    'extracted_text': "x" * 100, 'confidence': 90.0, 'page_count': 1, 'pages': None
+}).encode('utf-8'))
+
+
+def _result(text: str = "x" * 100) -> dict:
+    return {'success': True, 'extracted_text': text, 'confidence': 90.0, 'page_count': 1, 'pages': None}
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def cache(client):
+    return RedisOCRCache(client, max_bytes=5 * ENTRY_BYTES)
+
+
+def _stored(client) -> set:
+    return {key.decode('utf-8') for key in client.zrange(RedisOCRCache.LRU_KEY, 0, -1)}
+
+
+def test_least_recently_used_entries_are_evicted(cache, client):
+    for n in range(5):
+        cache.set(f"k{n}", _result())
+    assert cache.get("k0") is not None
+    
+    cache.set("k5", _result())
+    cache.set("k6", _result())
+    
+    assert _stored(client) == {"k0", "k3", "k4", "k5", "k6"}
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert client.hlen(RedisOCRCache.SIZES_KEY) == 5
+    assert int(client.get(RedisOCRCache.TOTAL_KEY)) == 5 * ENTRY_BYTES
+
+
+def test_one_large_entry_evicts_several_small_ones(cache, client):
+    for n in range(5):
+        cache.set(f"k{n}", _result())
+    
+    cache.set("big", _result("x" * (100 + 2 * ENTRY_BYTES)))
+    
+    assert _stored(client) == {"k3", "k4", "big"}
+    assert int(client.get(RedisOCRCache.TOTAL_KEY)) <= 5 * ENTRY_BYTES
+
+
+def test_rewriting_an_entry_counts_it_once(cache, client):
+    for _ in range(3):
+        cache.set("k0", _result())
+    
+    assert int(client.get(RedisOCRCache.TOTAL_KEY)) == ENTRY_BYTES
+
+
+def test_writes_do_not_scan_the_size_index(cache, client, monkeypatch):
+    cache.set("k0", _result())
+    scans = []
+    for command in ("hvals", "hgetall", "keys", "scan"):
+        monkeypatch.setattr(client, command, lambda *args, command=command, **kwargs: scans.append(command))
+    
+    for n in range(1, 50):
+        cache.set(f"k{n}", _result())
+    
+    assert scans == []
+    assert len(_stored(client)) == 5
+
+
+def test_counter_is_seeded_from_an_existing_cache(client):
+    older = RedisOCRCache(client, max_bytes=5 * ENTRY_BYTES)
+    for n in range(4):
+        older.set(f"k{n}", _result())
+    client.delete(RedisOCRCache.TOTAL_KEY)
+    
+    cache = RedisOCRCache(client, max_bytes=5 * ENTRY_BYTES)
+    cache.set("k4", _result())
+    cache.set("k5", _result())
+    
+    assert _stored(client) == {"k1", "k2", "k3", "k4", "k5"}
+    assert int(client.get(RedisOCRCache.TOTAL_KEY)) == 5 * ENTRY_BYTES
+
+
+def test_concurrent_eviction_is_not_subtracted_twice(client, monkeypatch):
+    first = RedisOCRCache(client, max_bytes=6 * ENTRY_BYTES)
+    second = RedisOCRCache(client, max_bytes=5 * ENTRY_BYTES)
+    for n in range(6):
+        first.set(f"k{n}", _result())
+    first.max_bytes = 5 * ENTRY_BYTES
+    
+    # Both processes read the oldest entries and their sizes before either
+    # removes k0
+    oldest = client.zrange(RedisOCRCache.LRU_KEY, 0, RedisOCRCache.EVICT_BATCH - 1)
+    sizes = client.hmget(RedisOCRCache.SIZES_KEY, oldest)
+    first._evict(6 * ENTRY_BYTES)
+    stale = {"zrange": oldest, "hmget": sizes}
+    for command in stale:
+        live = getattr(client, command)
+        monkeypatch.setattr(
+            client, command, lambda *args, command=command, live=live: stale.pop(command, None) or live(*args)
+        )
+    second._evict(6 * ENTRY_BYTES)
+    
+    assert _stored(client) == {"k1", "k2", "k3", "k4", "k5"}
+    total_bytes = int(client.get(RedisOCRCache.TOTAL_KEY))
+    assert total_bytes == sum(int(size) for size in client.hvals(RedisOCRCache.SIZES_KEY)) == 5 * ENTRY_BYTES
@@ -0,0 +1,70 @@
+"""
+OCR page worker pool creation from concurrent worker threads
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import ocr_service
+from app.services.ocr_service import OCRService
+
+THREADS = 16
+
+
+class SlowPool:
+    """Stands in for ProcessPoolExecutor; slow to start, like a fork server"""
+    
+    created = []
+    
+    def __init__(self, max_workers=None, mp_context=None):
+        time.sleep(0.05)
+        self.shut_down = False
+        SlowPool.created.append(self)
+    
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def service(monkeypatch):
+    SlowPool.created = []
+    monkeypatch.setattr(ocr_service, "ProcessPoolExecutor", SlowPool)
+    return OCRService()
+
+
+def _get_concurrently(service: OCRService) -> list:
+    barrier = threading.Barrier(THREADS)
+    executors = []
+    
+    def get():
+        barrier.wait()
+        executors.append(service._get_executor())
+    
+    threads = [threading.Thread(target=get) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return executors
+
+
+def test_concurrent_callers_share_one_pool(service):
+    executors = _get_concurrently(service)
+    
+    assert len(SlowPool.created) == 1
+    assert all(executor is SlowPool.created[0] for executor in executors)
+
+
+def test_broken_pool_is_replaced_once(service):
+    broken = service._get_executor()
+    
+    service._discard_executor(broken)
+    executors = _get_concurrently(service)
+    # A second thread seeing the same failure must not drop the new pool
+    service._discard_executor(broken)
+    
+    assert broken.shut_down
+    assert len(SlowPool.created) == 2
+    assert all(executor is SlowPool.created[1] for executor in executors)
+    assert service._get_executor() is SlowPool.created[1]
@@ -0,0 +1,76 @@
+"""
+Reprocessing while a retry is pending
+
+A retryable pipeline failure leaves the document claimed (PROCESSING) for
+the task queue's retry, so /reprocess must refuse it until retries run out
+and the worker marks it ERROR.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import documents
+from app.main import app
+from app.models.document import DocumentStatus
+from app.services.processing_service import processing_service
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Document ids handed to the queue by the API"""
+    queued = []
+    monkeypatch.setattr(documents, "_enqueue_processing", lambda document_id, use_cache=True: queued.append(document_id))
+    return queued
+
+
+@pytest.fixture
+def failing_ocr(monkeypatch):
+    monkeypatch.setattr(processing_service, "_read_file", lambda file_path: b"%PDF-1.4")
+    monkeypatch.setattr(
+        processing_service,
+        "_run_ocr",
+        lambda document, pdf_bytes, use_cache=True: {'success': False, 'error': "tesseract timed out"}
+    )
+
+
+def test_retryable_failure_keeps_the_document_claimed(db, make_document, failing_ocr):
+    document = make_document()
+    
+    result = asyncio.run(processing_service.process_document(document.id, db))
+    
+    assert result == {'success': False, 'error': "tesseract timed out", 'retryable': True}
+    db.refresh(document)
+    assert document.status == DocumentStatus.PROCESSING
+    assert document.error_message == "OCR failed: tesseract timed out"
+
+
+def test_reprocess_waits_until_retries_are_exhausted(db, make_document, auth_headers, failing_ocr, enqueued):
+    document = make_document()
+    asyncio.run(processing_service.process_document(document.id, db))
+    client = TestClient(app)
+    
+    # A retry is pending: queuing another pipeline would run two at once
+    response = client.post(f"/documents/{document.id}/reprocess", headers=auth_headers)
+    assert response.status_code == 409
+    assert enqueued == []
+    
+    # The worker gives up after its last retry
+    processing_service.mark_failed(db, document.id, "tesseract timed out")
+    db.refresh(document)
+    assert document.status == DocumentStatus.ERROR
+    assert document.error_message == "OCR failed: tesseract timed out"
+    
+    response = client.post(f"/documents/{document.id}/reprocess", headers=auth_headers)
+    assert response.status_code == 202
+    assert enqueued == [document.id]
+
+
+def test_mark_failed_leaves_finished_documents_alone(db, make_document):
+    document = make_document(status=DocumentStatus.READY)
+    
+    processing_service.mark_failed(db, document.id, "late failure")
+    
+    db.refresh(document)
+    assert document.status == DocumentStatus.READY
+    assert document.error_message is None
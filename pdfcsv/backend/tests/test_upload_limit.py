@@ -0,0 +1,50 @@
+"""
+Oversized uploads are refused early, with CORS headers
+
+The browser frontend can only read the 413 (and show "file too large") if
+the response carries Access-Control-Allow-Origin, so the size limit must
+sit inside the CORS middleware.
+"""
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.upload_limit import MULTIPART_OVERHEAD_BYTES
+from app.main import app
+
+ORIGIN = "https://app.example.com"
+OVERSIZED_BYTES = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024 + MULTIPART_OVERHEAD_BYTES + 1
+
+
+def _assert_refused_with_cors(response) -> None:
+    assert response.status_code == 413
+    assert response.json()["detail"] == f"File size must be less than {settings.MAX_UPLOAD_SIZE_MB}MB"
+    assert response.headers["access-control-allow-origin"] in (ORIGIN, "*")
+
+
+def test_oversized_content_length_gets_413_with_cors_headers(auth_headers):
+    client = TestClient(app)
+    
+    response = client.post(
+        "/documents/upload",
+        headers={**auth_headers, "Origin": ORIGIN, "Content-Type": "multipart/form-data; boundary=x"},
+        content=b"\0" * OVERSIZED_BYTES
+    )
+    
+    _assert_refused_with_cors(response)
+
+
+def test_oversized_chunked_body_gets_413_with_cors_headers(auth_headers):
+    client = TestClient(app)
+    
+    def body():
+        chunk = b"\0" * (1024 * 1024)
+        for _ in range(OVERSIZED_BYTES // len(chunk) + 1):
+            yield chunk
+    
+    response = client.post(
+        "/documents/upload",
+        headers={**auth_headers, "Origin": ORIGIN, "Content-Type": "multipart/form-data; boundary=x"},
+        content=body()
+    )
+    
+    _assert_refused_with_cors(response)
@@ -0,0 +1,129 @@
+"""
+Document processing queue
+
+Celery runs eagerly (tasks execute inline, retries included) against a
+stubbed ProcessingService.process_document, so these cover the queue wiring:
+what gets enqueued, when a task retries and with what backoff, and the
+document state once processing gives up.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import worker
+from app.api import documents
+from app.core.config import settings
+from app.main import app
+from app.models.document import Document, DocumentStatus
+from app.services.storage_service import LocalStorage
+from app.worker import celery_app, process_document_task, processing_service
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, db):
+    """
+    Stub for process_document; results are taken from pipeline.results in
+    order (the last one repeats) and calls are recorded as (id, use_cache)
+    """
+    class Pipeline:
+        results = [{'success': True}]
+        calls = []
+    
+    async def process_document(document_id, session, use_cache=True):
+        Pipeline.calls.append((document_id, use_cache))
+        result = Pipeline.results[min(len(Pipeline.calls), len(Pipeline.results)) - 1]
+        # Like the real pipeline: claimed while running, READY on success
+        document = session.get(Document, document_id)
+        if document:
+            document.status = DocumentStatus.READY if result['success'] else DocumentStatus.PROCESSING
+            session.commit()
+        return result
+    
+    monkeypatch.setattr(processing_service, "process_document", process_document)
+    return Pipeline
+
+
+@pytest.fixture
+def countdowns(monkeypatch):
+    """Backoff passed to each self.retry call"""
+    recorded = []
+    retry = process_document_task.retry
+    
+    def recording_retry(*args, **kwargs):
+        recorded.append(kwargs.get('countdown'))
+        return retry(*args, **kwargs)
+    
+    monkeypatch.setattr(process_document_task, "retry", recording_retry)
+    return recorded
+
+
+def _status(db, document_id: int) -> DocumentStatus:
+    db.expire_all()
+    return db.get(Document, document_id).status
+
+
+def test_upload_enqueues_processing(eager, pipeline, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(documents, "get_storage", lambda: LocalStorage(str(tmp_path)))
+    client = TestClient(app)
+    files = {"file": ("statement.pdf", b"%PDF-1.4 statement", "application/pdf")}
+    
+    first = client.post("/documents/upload", headers=auth_headers, files=files)
+    duplicate = client.post("/documents/upload", headers=auth_headers, files=files)
+    forced = client.post("/documents/upload", headers=auth_headers, files=files, params={"force": "true"})
+    
+    assert [first.status_code, duplicate.status_code, forced.status_code] == [201, 200, 201]
+    # The duplicate is not processed again; a forced upload skips the caches
+    assert pipeline.calls == [(first.json()["id"], True), (forced.json()["id"], False)]
+
+
+def test_retryable_failure_retries_with_backoff(eager, pipeline, countdowns, db, make_document):
+    document = make_document()
+    pipeline.results = [{'success': False, 'error': "OpenAI timeout", 'retryable': True}, {'success': True}]
+    
+    result = process_document_task.delay(document.id).get()
+    
+    assert result == {'success': True}
+    assert len(pipeline.calls) == 2
+    assert countdowns == [settings.PROCESSING_RETRY_BACKOFF_SECONDS]
+    assert _status(db, document.id) == DocumentStatus.READY
+
+
+def test_exhausted_retries_mark_the_document_failed(eager, pipeline, countdowns, db, make_document, monkeypatch):
+    monkeypatch.setattr(process_document_task, "max_retries", 3)
+    document = make_document()
+    pipeline.results = [{'success': False, 'error': "OpenAI timeout", 'retryable': True}]
+    
+    result = process_document_task.delay(document.id).get()
+    
+    assert result['retryable']
+    assert len(pipeline.calls) == 4
+    backoff = settings.PROCESSING_RETRY_BACKOFF_SECONDS
+    assert countdowns == [backoff, 2 * backoff, 4 * backoff]
+    assert countdowns == [worker.retry_countdown(n) for n in range(3)]
+    assert _status(db, document.id) == DocumentStatus.ERROR
+    db.refresh(document)
+    assert document.error_message == "OpenAI timeout"
+
+
+def test_non_retryable_failure_is_not_retried(eager, pipeline, countdowns, db, make_document):
+    document = make_document()
+    pipeline.results = [{'success': False, 'error': "Uploaded file not found", 'retryable': False}]
+    
+    result = process_document_task.delay(document.id).get()
+    
+    assert result['retryable'] is False
+    assert len(pipeline.calls) == 1
+    assert countdowns == []
+    assert _status(db, document.id) == DocumentStatus.ERROR
+
+
+def test_enqueue_passes_the_cache_flag(eager, pipeline, make_document):
+    document = make_document()
+    
+    worker.enqueue_document_processing(document.id, use_cache=False)
+    
+    assert pipeline.calls == [(document.id, False)]
@@ -77,9 +77,9 @@ export const documentsApi = {
     return response.data;
   },
 
-  list: async (skip = 0, limit = 50) => {
+  list: async (cursor?: string, limit = 50) => {
     const response = await api.get('/documents/', {
-      params: { skip, limit },
+      params: { cursor, limit },
     });
     return response.data;
   },
@@ -92,10 +92,25 @@ export const documentsApi = {
   delete: async (documentId: number) => {
     await api.delete(`/documents/${documentId}`);
   },
+
+  export: async (documentId: number, format = 'csv') => {
+    const response = await api.get(`/documents/${documentId}/export`, {
+      params: { format },
+      responseType: 'blob',
+    });
+    return response.data;
+  },
 };
 
 // Transactions API
 export const transactionsApi = {
+  list: async (filters: Record<string, any> = {}, cursor?: string, limit = 100) => {
+    const response = await api.get('/transactions/', {
+      params: { ...filters, cursor, limit },
+    });
+    return response.data;
+  },
+
   get: async (transactionId: number) => {
     const response = await api.get(`/transactions/${transactionId}`);
     return response.data;
@@ -110,6 +125,14 @@ export const transactionsApi = {
     await api.delete(`/transactions/${transactionId}`);
   },
 
+  export: async (filters: Record<string, any> = {}, format = 'csv') => {
+    const response = await api.get('/transactions/export', {
+      params: { ...filters, format },
+      responseType: 'blob',
+    });
+    return response.data;
+  },
+
   bulkUpdate: async (transactionIds: number[], updates: any) => {
     const response = await api.post('/transactions/bulk-update', {
       transaction_ids: transactionIds,